@@ -3,31 +3,155 @@ import sqlite3
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 import pandas as pd
-import spacy
-from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import numpy as np
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
+from email.mime.application import MIMEApplication
 import smtplib
 import io
-from fairlearn.metrics import MetricFrame, selection_rate, demographic_parity_difference
-import matplotlib.pyplot as plt
-import seaborn as sns
+import gzip
+import pickle
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import hashlib
+import json
+import zipfile
+from xml.etree import ElementTree
+from collections import OrderedDict
 import time
 import re
 import os
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from reportlab.lib.utils import ImageReader
-
-# Load the spaCy model for resume screening
-nlp = spacy.load("en_core_web_sm")
-
-# Connect to SQLite database
-conn = sqlite3.connect('ats_system.db', check_same_thread=False)
-cursor = conn.cursor()
+import sys
+import random
+import threading
+import socket
+import argparse
+import contextlib
+
+# spaCy model used for resume screening, loaded by load_nlp on first use
+NLP_MODEL = os.getenv("ATS_NLP_MODEL", "en_core_web_sm")
+# Skill extraction only needs the tagger, so the remaining components are skipped
+NLP_DISABLED_COMPONENTS = ["parser", "ner", "lemmatizer"]
+NLP_BATCH_SIZE = int(os.getenv("ATS_NLP_BATCH_SIZE", "256"))
+NLP_N_PROCESS = int(os.getenv("ATS_NLP_N_PROCESS", "1"))
+JOB_SKILL_CACHE_SIZE = 512
+# Skill extraction backend: "pos" keeps every noun the tagger finds, "lexicon" matches only the skill
+# lexicon's phrases (check that it covers your job descriptions, e.g. with bench/skill_extractors.py)
+SKILL_EXTRACTOR = os.getenv("ATS_SKILL_EXTRACTOR", "pos")
+SKILL_LEXICON_PATH = os.getenv("ATS_SKILL_LEXICON")  # one skill per line, "skill, alias, ..."; default DEFAULT_SKILL_LEXICON
+
+# spaCy, fairlearn, matplotlib and seaborn each take up to seconds to import, so
+# they are loaded on first use: pages that do not screen or chart never pay for them
+@st.cache_resource
+def load_nlp():
+    """Returns the process-wide spaCy pipeline, loading it on first use."""
+    import spacy
+    started = time.perf_counter()
+    nlp = spacy.load(NLP_MODEL)
+    print(f"Loaded spaCy model {NLP_MODEL} in {time.perf_counter() - started:.2f}s")
+    return nlp
+
+@st.cache_resource
+def load_plotting():
+    """Returns matplotlib.pyplot and seaborn for the dashboard charts, importing them on first use."""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    return plt, sns
+
+@st.cache_resource
+def load_skill_matcher():
+    """Returns a tokenizer-only spaCy pipeline and a PhraseMatcher over the skill lexicon."""
+    import spacy
+    from spacy.matcher import PhraseMatcher
+    nlp = spacy.blank("en")
+    matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
+    for skill, phrases in load_skill_lexicon().items():
+        matcher.add(skill, list(nlp.tokenizer.pipe(skill_match_text(phrase) for phrase in phrases)))
+    return nlp, matcher
+
+# Background screening worker settings
+SCREENING_BATCH_SIZE = int(os.getenv("ATS_SCREENING_BATCH_SIZE", "100"))
+SCREENING_LEASE_SECONDS = 600
+SCREENING_POLL_INTERVAL = 5.0
+SCREENING_PASS_SCORE = 50  # match score at which an application is screened as a Success
+MANUAL_REVIEW_STATUS = "Manual Review"  # applications the worker cannot screen, e.g. their job was deleted
+NO_JOB_SKILLS_WARNING = (f"⚠️ No skills were found in this job description, so its applications will go to {MANUAL_REVIEW_STATUS} "
+                         "instead of being screened. List the required skills in the description; once it has some, "
+                         "they are queued for screening again.")
+RESULT_BATCH_SIZE = int(os.getenv("ATS_RESULT_BATCH_SIZE", "1000"))  # result rows written per transaction
+# Outbound mail settings; ATS_SENDER_EMAIL and ATS_SENDER_PASSWORD must be set to send mail.
+# Point ATS_SMTP_SERVER/PORT at a local debugging server (with ATS_SMTP_STARTTLS=0 and
+# no ATS_SENDER_PASSWORD) to test without sending
+SMTP_SERVER = os.getenv("ATS_SMTP_SERVER", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("ATS_SMTP_PORT", "587"))
+SMTP_STARTTLS = os.getenv("ATS_SMTP_STARTTLS", "1") == "1"
+SENDER_EMAIL = os.getenv("ATS_SENDER_EMAIL", "")
+SENDER_PASSWORD = os.getenv("ATS_SENDER_PASSWORD", "")
+MAIL_RATE_LIMIT = float(os.getenv("ATS_MAIL_RATE_LIMIT", "5"))  # messages per second, 0 disables
+MAIL_BATCH_SIZE = 50
+MAIL_MAX_ATTEMPTS = 5
+MAIL_RETRY_BASE_SECONDS = 30
+MAIL_LEASE_SECONDS = 300
+MAIL_TIMEOUT = 30
+MAIL_CONCURRENCY = int(os.getenv("ATS_MAIL_CONCURRENCY", "8"))  # parallel SMTP connections for bulk sends
+# Feedback report rendering
+REPORT_DIR = "feedback_reports"
+REPORT_SHARDS = 256
+REPORT_WORKERS = int(os.getenv("ATS_REPORT_WORKERS", str(os.cpu_count() or 1)))  # render processes, CLI worker only
+REPORT_PARALLEL_THRESHOLD = 128  # smaller batches are not worth starting a process pool
+REPORT_SWEEP_INTERVAL = int(os.getenv("ATS_REPORT_SWEEP_INTERVAL", "3600"))  # seconds between the worker's sweeps of old reports
+REPORT_SWEEP_MIN_AGE = 3600  # newer report files may not be recorded in applications yet, so sweeps keep them
+REPORT_CACHE_BYTES = int(os.getenv("ATS_REPORT_CACHE_BYTES", str(64 * 1024 * 1024)))  # in-memory rendered reports
+DASHBOARD_CACHE_TTL = int(os.getenv("ATS_DASHBOARD_CACHE_TTL", "30"))  # seconds a dashboard chart's data is reused
+ADMIN_PAGE_SIZE = int(os.getenv("ATS_ADMIN_PAGE_SIZE", "50"))  # rows per page in the admin tables
+EXPORT_CHUNK_SIZE = int(os.getenv("ATS_EXPORT_CHUNK_SIZE", "5000"))  # rows held in memory while exporting
+EXPORT_DIR = "exports"
+QUERY_CACHE_SIZE = int(os.getenv("ATS_QUERY_CACHE_SIZE", "256"))  # read-mostly query results kept in memory
+# Resume uploads
+RESUME_BLOB_DIR = "resume_blobs"
+RESUME_MAX_BYTES = int(os.getenv("ATS_RESUME_MAX_BYTES", str(10 * 1024 * 1024)))  # largest upload accepted
+RESUME_MAX_PAGES = int(os.getenv("ATS_RESUME_MAX_PAGES", "20"))  # PDF pages read
+RESUME_MAX_CHARS = int(os.getenv("ATS_RESUME_MAX_CHARS", "50000"))  # resume text kept, and parsed by spaCy
+
+# SQLite database; every thread gets its own connection from get_connection()
+DB_PATH = os.getenv("ATS_DB_PATH", "ats_system.db")
+DB_BUSY_TIMEOUT_MS = int(os.getenv("ATS_DB_BUSY_TIMEOUT_MS", "30000"))  # wait this long for a write lock
+DB_CACHE_SIZE_KB = int(os.getenv("ATS_DB_CACHE_SIZE_KB", "65536"))  # page cache per connection
+DB_MMAP_SIZE = int(os.getenv("ATS_DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+def open_connection(path=DB_PATH):
+    """Opens a SQLite connection in WAL mode, so readers never wait for the writer."""
+    db = sqlite3.connect(path, timeout=DB_BUSY_TIMEOUT_MS / 1000)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")  # durable at each WAL checkpoint; safe from corruption
+    db.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+    db.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}")
+    db.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+    db.execute("PRAGMA temp_store=MEMORY")
+    return db
+
+class ConnectionProvider:
+    """Hands each thread its own SQLite connection, opened on first use and reused after that."""
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+
+    def get(self):
+        db = getattr(self.local, "db", None)
+        if db is None:
+            db = self.local.db = open_connection(self.path)
+        return db
+
+@st.cache_resource
+def connection_provider(path=DB_PATH):
+    """Process-wide connection provider, kept across Streamlit reruns."""
+    return ConnectionProvider(path)
+
+def get_connection():
+    """Returns the calling thread's connection to DB_PATH."""
+    return connection_provider(DB_PATH).get()
 
 # CSS Styling
 st.markdown(
@@ -153,13 +277,29 @@ st.markdown(
     unsafe_allow_html=True
 )
 # Database table setup
+@st.cache_resource
 def setup_database():
+    """Brings the database schema up to date once per process rather than on every rerun."""
+    migrate_schema()
+    sync_skill_extractor()
+
+def _add_column(table, column, declaration):
+    """Adds a column to a table unless it already has one by that name."""
+    cursor = get_connection().cursor()
+    columns = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+    if column not in columns:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+
+def _create_base_schema():
+    """Creates the original tables and adds the columns that older databases are missing."""
+    cursor = get_connection().cursor()
     cursor.execute(''' 
         CREATE TABLE IF NOT EXISTS users (
             user_id INTEGER PRIMARY KEY AUTOINCREMENT,
             username TEXT UNIQUE NOT NULL,
             password TEXT NOT NULL,
-            role TEXT NOT NULL CHECK (role IN ('admin', 'applicant'))
+            role TEXT NOT NULL CHECK (role IN ('admin', 'applicant')),
+            otp TEXT
         )
     ''')
     cursor.execute(''' 
@@ -182,42 +322,1050 @@ def setup_database():
             status TEXT DEFAULT 'Under Review',
             feedback TEXT DEFAULT '',
             submitted_on DATE NOT NULL,
-            resume TEXT,
             match_score REAL DEFAULT 0.0,
             category TEXT DEFAULT 'Uncategorized',
+            pdf_report TEXT,
+            lease_owner TEXT,
+            lease_expires REAL,
             FOREIGN KEY (user_id) REFERENCES users (user_id),
             FOREIGN KEY (job_id) REFERENCES jobs (job_id)
         )
     ''')
+    cursor.execute(''' 
+        CREATE TABLE IF NOT EXISTS job_skills (
+            job_id INTEGER NOT NULL,
+            description_hash TEXT NOT NULL,
+            skills TEXT NOT NULL,
+            PRIMARY KEY (job_id, description_hash),
+            FOREIGN KEY (job_id) REFERENCES jobs (job_id)
+        )
+    ''')
+    cursor.execute(''' 
+        CREATE TABLE IF NOT EXISTS application_skills (
+            applicant_id INTEGER PRIMARY KEY,
+            skills TEXT NOT NULL,
+            FOREIGN KEY (applicant_id) REFERENCES applications (applicant_id)
+        )
+    ''')
+    # Durable outbound mail queue drained by deliver_outbox
+    cursor.execute(''' 
+        CREATE TABLE IF NOT EXISTS outbox (
+            message_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            recipient TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            body TEXT NOT NULL,
+            attachment_path TEXT,
+            attachment_name TEXT,
+            applicant_id INTEGER,
+            template TEXT,
+            status TEXT NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'sending', 'sent', 'failed')),
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL DEFAULT 0,
+            claimed_by TEXT,
+            last_error TEXT,
+            created_at TEXT NOT NULL,
+            sent_at TEXT
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt_at)")
+    # One row per send attempt, with the server's reply
+    cursor.execute(''' 
+        CREATE TABLE IF NOT EXISTS email_deliveries (
+            delivery_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            message_id INTEGER,
+            applicant_id INTEGER,
+            template TEXT,
+            recipient TEXT NOT NULL,
+            status TEXT NOT NULL CHECK (status IN ('sent', 'deferred', 'failed')),
+            attempted_at TEXT NOT NULL,
+            smtp_response TEXT,
+            FOREIGN KEY (message_id) REFERENCES outbox (message_id),
+            FOREIGN KEY (applicant_id) REFERENCES applications (applicant_id)
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_email_deliveries_applicant ON email_deliveries (applicant_id, delivery_id)")
+    # Inverted skill indexes used to recommend candidates across jobs
+    cursor.execute(''' 
+        CREATE TABLE IF NOT EXISTS application_skill_index (
+            skill TEXT NOT NULL,
+            applicant_id INTEGER NOT NULL,
+            PRIMARY KEY (skill, applicant_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_application_skill_index_applicant ON application_skill_index (applicant_id)")
+    cursor.execute(''' 
+        CREATE TABLE IF NOT EXISTS job_skill_index (
+            job_id INTEGER NOT NULL,
+            skill TEXT NOT NULL,
+            PRIMARY KEY (job_id, skill)
+        ) WITHOUT ROWID
+    ''')
+    _add_column("users", "otp", "TEXT")
+    _add_column("applications", "pdf_report", "TEXT")
+    # Lease columns used by the screening worker to claim applications
+    _add_column("applications", "lease_owner", "TEXT")
+    _add_column("applications", "lease_expires", "REAL")
+
+def _move_resumes_out_of_applications():
+    """Copies resume text into application_resumes and drops it from applications."""
+    cursor = get_connection().cursor()
+    # Resume text lives apart from applications so status and category scans never page through it
+    cursor.execute(''' 
+        CREATE TABLE IF NOT EXISTS application_resumes (
+            applicant_id INTEGER PRIMARY KEY,
+            resume TEXT NOT NULL,
+            FOREIGN KEY (applicant_id) REFERENCES applications (applicant_id)
+        )
+    ''')
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(applications)")}
+    if "resume" not in columns:
+        return
+    cursor.execute(
+        "INSERT OR IGNORE INTO application_resumes (applicant_id, resume) SELECT applicant_id, resume FROM applications WHERE resume IS NOT NULL"
+    )
+    if sqlite3.sqlite_version_info >= (3, 35, 0):
+        cursor.execute("ALTER TABLE applications DROP COLUMN resume")
+    else:
+        cursor.execute("UPDATE applications SET resume = NULL")  # DROP COLUMN needs SQLite 3.35
+
+def _index_applications():
+    """Indexes applications for the dashboard's status, score, category, job and user lookups."""
+    cursor = get_connection().cursor()
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_applications_status_score ON applications (status, match_score)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_applications_category ON applications (category, match_score, name, email)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_applications_job ON applications (job_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_applications_user_job ON applications (user_id, job_id)")
+
+def _index_application_pages():
+    """Indexes applications by status alone, which keeps each status's rows in applicant_id order."""
+    get_connection().execute("CREATE INDEX IF NOT EXISTS idx_applications_status_id ON applications (status)")
+
+# Default minimum match score of each category; the live values are in category_thresholds
+CATEGORY_THRESHOLDS = [("Highly Fit", 80), ("Moderate Fit", 70), ("Low Fit", 50), ("Rejected", 0)]
+CATEGORIZED_STATUSES = "('Success', 'Approved')"
+# Statuses set by screening, which rescoring may change; 'Approved' is a human decision and is left alone
+SCREENED_STATUSES = "('Success', 'Rejected')"
+# The highest category whose threshold a score reaches
+CATEGORY_FOR_SCORE_SQL = "(SELECT category FROM category_thresholds WHERE min_score <= {score} ORDER BY min_score DESC LIMIT 1)"
+CATEGORIZE_SQL = f"""
+    UPDATE applications SET category = COALESCE({CATEGORY_FOR_SCORE_SQL.format(score="applications.match_score")}, 'Uncategorized')
+    WHERE status IN {CATEGORIZED_STATUSES}
+"""
+
+def _categorize_with_thresholds():
+    """Stores category thresholds in a table and keeps categories current with triggers."""
+    cursor = get_connection().cursor()
+    cursor.execute(''' 
+        CREATE TABLE IF NOT EXISTS category_thresholds (
+            category TEXT PRIMARY KEY,
+            min_score REAL NOT NULL
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_category_thresholds_min_score ON category_thresholds (min_score, category)")
+    cursor.executemany("INSERT OR IGNORE INTO category_thresholds (category, min_score) VALUES (?, ?)", CATEGORY_THRESHOLDS)
+    category = f"COALESCE({CATEGORY_FOR_SCORE_SQL.format(score='NEW.match_score')}, 'Uncategorized')"
+    changed = "(OLD.status IS NOT NEW.status OR OLD.match_score IS NOT NEW.match_score)"
+    for event, condition in (("INSERT", ""), ("UPDATE OF status, match_score", f" AND {changed}")):
+        name = "applications_categorize_on_" + event.split()[0].lower()
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON applications
+            WHEN NEW.status IN {CATEGORIZED_STATUSES}{condition}
+            BEGIN
+                UPDATE applications SET category = {category} WHERE applicant_id = NEW.applicant_id;
+            END
+        """)
+    cursor.execute(CATEGORIZE_SQL)
+
+# Application columns counted in dashboard_counters for the dashboard charts
+DASHBOARD_DIMENSIONS = ("status", "gender")
+
+def rebuild_dashboard_counters():
+    """Recounts dashboard_counters from applications (caller commits)."""
+    cursor = get_connection().cursor()
+    cursor.execute("DELETE FROM dashboard_counters")
+    for dimension in DASHBOARD_DIMENSIONS:
+        cursor.execute(f"""
+            INSERT INTO dashboard_counters (dimension, value, count)
+            SELECT '{dimension}', COALESCE({dimension}, 'Unknown'), COUNT(*) FROM applications GROUP BY 2
+        """)
+
+def _maintain_dashboard_counters():
+    """Keeps per-status and per-gender application counts in dashboard_counters with triggers."""
+    cursor = get_connection().cursor()
+    cursor.execute(''' 
+        CREATE TABLE IF NOT EXISTS dashboard_counters (
+            dimension TEXT NOT NULL,
+            value TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (dimension, value)
+        ) WITHOUT ROWID
+    ''')
+    def increment(dimension):
+        return f"""
+            INSERT INTO dashboard_counters (dimension, value, count) VALUES ('{dimension}', COALESCE(NEW.{dimension}, 'Unknown'), 1)
+            ON CONFLICT (dimension, value) DO UPDATE SET count = count + 1;
+        """
+    def decrement(dimension):
+        return f"""
+            UPDATE dashboard_counters SET count = count - 1
+            WHERE dimension = '{dimension}' AND value = COALESCE(OLD.{dimension}, 'Unknown');
+        """
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS dashboard_counters_on_insert AFTER INSERT ON applications
+        BEGIN {"".join(increment(dimension) for dimension in DASHBOARD_DIMENSIONS)} END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS dashboard_counters_on_delete AFTER DELETE ON applications
+        BEGIN {"".join(decrement(dimension) for dimension in DASHBOARD_DIMENSIONS)} END
+    """)
+    for dimension in DASHBOARD_DIMENSIONS:
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS dashboard_counters_on_{dimension}_change AFTER UPDATE OF {dimension} ON applications
+            WHEN OLD.{dimension} IS NOT NEW.{dimension}
+            BEGIN {decrement(dimension)} {increment(dimension)} END
+        """)
+    rebuild_dashboard_counters()
+
+# Confusion-matrix cell of an application: status 'Success' is the actual outcome, a passing score the prediction
+FAIRNESS_KEY_COLUMNS = ("gender", "job_id", "actual", "predicted")
+FAIRNESS_KEY_SQL = {
+    "gender": "COALESCE({row}.gender, 'Unknown')",
+    "job_id": "COALESCE({row}.job_id, 0)",
+    "actual": "COALESCE({row}.status = 'Success', 0)",
+    "predicted": f"COALESCE({{row}}.match_score >= {SCREENING_PASS_SCORE}, 0)",
+}
+
+def rebuild_fairness_counters():
+    """Recounts fairness_counters from applications (caller commits)."""
+    cursor = get_connection().cursor()
+    cursor.execute("DELETE FROM fairness_counters")
+    keys = ", ".join(FAIRNESS_KEY_SQL[column].format(row="applications") for column in FAIRNESS_KEY_COLUMNS)
+    cursor.execute(f"""
+        INSERT INTO fairness_counters ({", ".join(FAIRNESS_KEY_COLUMNS)}, count)
+        SELECT {keys}, COUNT(*) FROM applications GROUP BY 1, 2, 3, 4
+    """)
+
+def _maintain_fairness_counters():
+    """Keeps per-gender, per-job confusion-matrix counts in fairness_counters with triggers."""
+    cursor = get_connection().cursor()
+    cursor.execute(''' 
+        CREATE TABLE IF NOT EXISTS fairness_counters (
+            gender TEXT NOT NULL,
+            job_id INTEGER NOT NULL,
+            actual INTEGER NOT NULL,
+            predicted INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (gender, job_id, actual, predicted)
+        ) WITHOUT ROWID
+    ''')
+    def key(row):
+        return ", ".join(FAIRNESS_KEY_SQL[column].format(row=row) for column in FAIRNESS_KEY_COLUMNS)
+    def matches(row):
+        return " AND ".join(f"{column} = {FAIRNESS_KEY_SQL[column].format(row=row)}" for column in FAIRNESS_KEY_COLUMNS)
+    increment = f"""
+        INSERT INTO fairness_counters ({", ".join(FAIRNESS_KEY_COLUMNS)}, count) VALUES ({key("NEW")}, 1)
+        ON CONFLICT ({", ".join(FAIRNESS_KEY_COLUMNS)}) DO UPDATE SET count = count + 1;
+    """
+    decrement = f"UPDATE fairness_counters SET count = count - 1 WHERE {matches('OLD')};"
+    changed = " OR ".join(f"{FAIRNESS_KEY_SQL[column].format(row='OLD')} IS NOT {FAIRNESS_KEY_SQL[column].format(row='NEW')}"
+                          for column in FAIRNESS_KEY_COLUMNS)
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS fairness_counters_on_insert AFTER INSERT ON applications BEGIN {increment} END")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS fairness_counters_on_delete AFTER DELETE ON applications BEGIN {decrement} END")
+    # Only updates that move an application to another cell touch the counters
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS fairness_counters_on_update AFTER UPDATE OF gender, job_id, status, match_score ON applications
+        WHEN {changed}
+        BEGIN {decrement} {increment} END
+    """)
+    rebuild_fairness_counters()
+
+def _bump_cache_version(scope, key):
+    """Trigger statement that invalidates the cached queries of one cache_versions scope."""
+    return f"""
+        INSERT INTO cache_versions (scope, key, version) VALUES ('{scope}', {key}, 1)
+        ON CONFLICT (scope, key) DO UPDATE SET version = version + 1;
+    """
+
+def _version_cached_queries():
+    """Bumps a version in cache_versions whenever jobs, or a user's applications, change."""
+    cursor = get_connection().cursor()
+    cursor.execute(''' 
+        CREATE TABLE IF NOT EXISTS cache_versions (
+            scope TEXT NOT NULL,
+            key INTEGER NOT NULL,
+            version INTEGER NOT NULL,
+            PRIMARY KEY (scope, key)
+        ) WITHOUT ROWID
+    ''')
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS cache_versions_on_job_{event.lower()} AFTER {event} ON jobs
+            BEGIN {_bump_cache_version("jobs", 0)} END
+        """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS cache_versions_on_application_insert AFTER INSERT ON applications
+        BEGIN {_bump_cache_version("applications", "COALESCE(NEW.user_id, 0)")} END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS cache_versions_on_application_delete AFTER DELETE ON applications
+        BEGIN {_bump_cache_version("applications", "COALESCE(OLD.user_id, 0)")} END
+    """)
+    # Only the columns an applicant's own list shows invalidate it
+    columns = ("user_id", "job_id", "submitted_on", "status", "feedback", "email")
+    changed = " OR ".join(f"OLD.{column} IS NOT NEW.{column}" for column in columns)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS cache_versions_on_application_update AFTER UPDATE OF {", ".join(columns)} ON applications
+        WHEN {changed}
+        BEGIN {_bump_cache_version("applications", "COALESCE(OLD.user_id, 0)")} {_bump_cache_version("applications", "COALESCE(NEW.user_id, 0)")} END
+    """)
+
+def _store_resume_uploads():
+    """Caches the text extracted from each uploaded resume file by the file's SHA-256."""
+    cursor = get_connection().cursor()
+    cursor.execute(''' 
+        CREATE TABLE IF NOT EXISTS resume_uploads (
+            upload_hash TEXT PRIMARY KEY,
+            format TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            uploaded_on TEXT NOT NULL
+        )
+    ''')
+    # The raw file stays in the blob store; applications only keep its hash
+    _add_column("application_resumes", "upload_hash", "TEXT")
+
+def _deduplicate_resumes():
+    """Stores each distinct resume text once in resumes, with its skills, and links applications to it.
+
+    application_resumes keeps one row per application, now holding the resume's
+    hash instead of its text, and application_skills becomes a view over resumes.
+    Each step checks the current schema first, so the migration can run again
+    on a database where it was already (partly) applied.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    conn.create_function("text_hash", 1, text_hash, deterministic=True)
+    cursor.execute(''' 
+        CREATE TABLE IF NOT EXISTS resumes (
+            resume_hash TEXT PRIMARY KEY,
+            resume TEXT NOT NULL,
+            skills TEXT
+        )
+    ''')
+    # SQLite cannot change a column in place, so both tables are rebuilt around the hash
+    if "resume" in {row[1] for row in cursor.execute("PRAGMA table_info(application_resumes)")}:
+        cursor.execute("INSERT OR IGNORE INTO resumes (resume_hash, resume) SELECT text_hash(resume), resume FROM application_resumes")
+        cursor.execute("DROP TABLE IF EXISTS application_resumes_new")
+        cursor.execute(''' 
+            CREATE TABLE application_resumes_new (
+                applicant_id INTEGER PRIMARY KEY,
+                resume_hash TEXT NOT NULL,
+                upload_hash TEXT,
+                FOREIGN KEY (applicant_id) REFERENCES applications (applicant_id),
+                FOREIGN KEY (resume_hash) REFERENCES resumes (resume_hash)
+            )
+        ''')
+        cursor.execute(''' 
+            INSERT INTO application_resumes_new (applicant_id, resume_hash, upload_hash)
+            SELECT applicant_id, text_hash(resume), upload_hash FROM application_resumes
+        ''')
+        cursor.execute("DROP TABLE application_resumes")
+        cursor.execute("ALTER TABLE application_resumes_new RENAME TO application_resumes")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_application_resumes_hash ON application_resumes (resume_hash)")
+    if "text" in {row[1] for row in cursor.execute("PRAGMA table_info(resume_uploads)")}:
+        cursor.execute("INSERT OR IGNORE INTO resumes (resume_hash, resume) SELECT text_hash(text), text FROM resume_uploads")
+        cursor.execute("DROP TABLE IF EXISTS resume_uploads_new")
+        cursor.execute(''' 
+            CREATE TABLE resume_uploads_new (
+                upload_hash TEXT PRIMARY KEY,
+                format TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                resume_hash TEXT NOT NULL,
+                uploaded_on TEXT NOT NULL,
+                FOREIGN KEY (resume_hash) REFERENCES resumes (resume_hash)
+            )
+        ''')
+        cursor.execute(''' 
+            INSERT INTO resume_uploads_new (upload_hash, format, size, resume_hash, uploaded_on)
+            SELECT upload_hash, format, size, text_hash(text), uploaded_on FROM resume_uploads
+        ''')
+        cursor.execute("DROP TABLE resume_uploads")
+        cursor.execute("ALTER TABLE resume_uploads_new RENAME TO resume_uploads")
+    if cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'application_skills'").fetchone():
+        # Skills already extracted for any copy of a resume become that resume's skills
+        cursor.execute(''' 
+            UPDATE resumes SET skills = (
+                SELECT s.skills FROM application_resumes ar JOIN application_skills s ON s.applicant_id = ar.applicant_id
+                WHERE ar.resume_hash = resumes.resume_hash LIMIT 1
+            )
+            WHERE skills IS NULL
+        ''')
+        cursor.execute("DROP TABLE application_skills")
+    cursor.execute(''' 
+        CREATE VIEW IF NOT EXISTS application_skills AS
+        SELECT ar.applicant_id, r.skills FROM application_resumes ar JOIN resumes r ON r.resume_hash = ar.resume_hash
+        WHERE r.skills IS NOT NULL
+    ''')
+
+def _record_skill_extractor():
+    """Adds a settings table and records that the skills stored so far came from the POS extractor."""
+    cursor = get_connection().cursor()
+    cursor.execute(''' 
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO settings (key, value) VALUES ('skill_extractor', 'pos:en_core_web_sm')")
+
+def _index_deliveries_by_template():
+    """Indexes email deliveries by template, so an applicant's latest category email is one index lookup."""
+    get_connection().execute(
+        "CREATE INDEX IF NOT EXISTS idx_email_deliveries_template ON email_deliveries (applicant_id, template, delivery_id)"
+    )
+
+# Schema changes applied once per database, in order, by migrate_schema
+SCHEMA_MIGRATIONS = [
+    (1, "Create the base schema", _create_base_schema),
+    (2, "Move resume text into application_resumes", _move_resumes_out_of_applications),
+    (3, "Index applications for dashboard queries", _index_applications),
+    (4, "Categorize applications from category_thresholds with triggers", _categorize_with_thresholds),
+    (5, "Maintain dashboard_counters with triggers", _maintain_dashboard_counters),
+    (6, "Index applications by status in applicant_id order for paging", _index_application_pages),
+    (7, "Maintain fairness_counters with triggers", _maintain_fairness_counters),
+    (8, "Version cached job and application queries with triggers", _version_cached_queries),
+    (9, "Cache text extracted from resume uploads in resume_uploads", _store_resume_uploads),
+    (10, "Store each distinct resume and its skills once in resumes", _deduplicate_resumes),
+    (11, "Record which skill extractor produced the stored skills", _record_skill_extractor),
+    (12, "Index email deliveries by applicant and template", _index_deliveries_by_template),
+]
+
+def migrate_schema():
+    """Applies pending SCHEMA_MIGRATIONS, each in its own transaction, and records them in schema_version.
+
+    Each transaction takes the write lock up front and re-checks schema_version,
+    so processes starting together apply every migration exactly once.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(''' 
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_on TEXT NOT NULL
+        )
+    ''')
     conn.commit()
-    # Ensure 'pdf_report' column exists
-    try:
-        cursor.execute("ALTER TABLE applications ADD COLUMN pdf_report TEXT")
-        conn.commit()
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    try:
-        cursor.execute("ALTER TABLE users ADD COLUMN otp TEXT")
-        conn.commit()
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-# Function to calculate similarity score
-def calculate_similarity(job_description, resume_text):
-    vectorizer = CountVectorizer().fit_transform([job_description, resume_text])
-    similarity_matrix = cosine_similarity(vectorizer)
-    return similarity_matrix[0][1] * 100
+    applied = {version for (version,) in cursor.execute("SELECT version FROM schema_version")}
+    for version, description, migration in SCHEMA_MIGRATIONS:
+        if version in applied:
+            continue
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            if cursor.execute("SELECT 1 FROM schema_version WHERE version = ?", (version,)).fetchone():
+                conn.rollback()  # another process applied it while we waited for the lock
+                continue
+            migration()
+            cursor.execute("INSERT INTO schema_version (version, description, applied_on) VALUES (?, ?, ?)",
+                           (version, description, datetime.now().isoformat(timespec="seconds")))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"Applied schema migration {version}: {description}")
+
+# Dashboard queries over applications; explain_dashboard_queries checks that each one uses an index
+# Admin lists leave resume text out; load_resume fetches it for one applicant on demand
+APPLICATION_LIST_COLUMNS = "applicant_id, name, email, gender, job_id, status, feedback, submitted_on, match_score"
+APPLICATIONS_BY_STATUS_SQL = f"SELECT {APPLICATION_LIST_COLUMNS} FROM applications WHERE status = ?"
+APPLICATIONS_PAGE_SQL = f"""
+    SELECT {APPLICATION_LIST_COLUMNS} FROM applications
+    WHERE status = ? AND applicant_id > ? ORDER BY applicant_id LIMIT ?
+"""
+ALL_APPLICATIONS_PAGE_SQL = f"""
+    SELECT {APPLICATION_LIST_COLUMNS} FROM applications
+    WHERE applicant_id > ? ORDER BY applicant_id LIMIT ?
+"""
+JOBS_PAGE_SQL = """
+    SELECT job_id, title, description, posted_on, deadline FROM jobs
+    WHERE title LIKE ? AND job_id > ? ORDER BY job_id LIMIT ?
+"""
+JOBS_LIST_SQL = "SELECT title, description, posted_on, deadline FROM jobs"
+JOB_TITLES_SQL = "SELECT job_id, title FROM jobs"
+JOB_COUNT_SQL = "SELECT COUNT(*) AS jobs FROM jobs"
+REASSESSMENT_CANDIDATES_SQL = f"""
+    SELECT {APPLICATION_LIST_COLUMNS} FROM applications
+    WHERE status = 'Rejected' AND match_score BETWEEN ? AND ?
+"""
+UNDER_REVIEW_SQL = "SELECT applicant_id, name, email, job_id FROM applications WHERE status = 'Under Review'"
+DASHBOARD_COUNTS_SQL = "SELECT value, count FROM dashboard_counters WHERE dimension = ? AND count > 0 ORDER BY value"
+# Confusion-matrix counts per gender or job; the parameters are a job_id to restrict to, or NULL for every job
+FAIRNESS_GROUPS = ("gender", "job_id")
+FAIRNESS_COUNTS_SQL = """
+    SELECT {group},
+           SUM(CASE WHEN actual AND predicted THEN count ELSE 0 END) AS tp,
+           SUM(CASE WHEN NOT actual AND predicted THEN count ELSE 0 END) AS fp,
+           SUM(CASE WHEN actual AND NOT predicted THEN count ELSE 0 END) AS fn,
+           SUM(CASE WHEN NOT actual AND NOT predicted THEN count ELSE 0 END) AS tn
+    FROM fairness_counters WHERE ? IS NULL OR job_id = ?
+    GROUP BY {group} HAVING SUM(count) > 0 ORDER BY {group}
+"""
+# Template of the emails sent from Categorized Applications; its latest delivery is that view's "Email Status"
+CATEGORY_EMAIL_TEMPLATE = "category_update"
+CATEGORY_APPLICANTS_SQL = f"""
+    SELECT a.applicant_id, a.name, a.email, a.match_score, d.status
+    FROM applications a
+    LEFT JOIN email_deliveries d ON d.delivery_id = (
+        SELECT MAX(delivery_id) FROM email_deliveries WHERE applicant_id = a.applicant_id AND template = '{CATEGORY_EMAIL_TEMPLATE}'
+    )
+    WHERE a.category = ?
+"""
+JOB_APPLICANTS_SQL = f"SELECT applicant_id, name, email, job_id, status FROM applications WHERE job_id = ? AND status IN {SCREENED_STATUSES}"
+USER_APPLICATIONS_SQL = """
+    SELECT a.job_id, j.title, j.deadline, a.submitted_on, a.status, a.feedback, a.email
+    FROM applications a
+    JOIN jobs j ON a.job_id = j.job_id
+    WHERE a.user_id = ?
+"""
+USER_JOB_APPLICATION_COUNT_SQL = "SELECT COUNT(*) FROM applications WHERE user_id = ? AND job_id = ?"
+ACTIVE_LEASES_SQL = "SELECT COUNT(*) FROM applications WHERE status = 'Under Review' AND lease_expires > ?"
+
+DASHBOARD_QUERIES = {
+    "applications by status": (APPLICATIONS_BY_STATUS_SQL, ("Rejected",)),
+    "applications page": (APPLICATIONS_PAGE_SQL, ("Rejected", 0, 50)),
+    "all applications page": (ALL_APPLICATIONS_PAGE_SQL, (0, 50)),
+    "reassessment candidates": (REASSESSMENT_CANDIDATES_SQL, (40, 50)),
+    "under review": (UNDER_REVIEW_SQL, ()),
+    "categorize": (CATEGORIZE_SQL, ()),
+    "dashboard counts": (DASHBOARD_COUNTS_SQL, ("status",)),
+    "category applicants": (CATEGORY_APPLICANTS_SQL, ("Highly Fit",)),
+    "job applicants": (JOB_APPLICANTS_SQL, (1,)),
+    "user applications": (USER_APPLICATIONS_SQL, (1,)),
+    "user job application count": (USER_JOB_APPLICATION_COUNT_SQL, (1, 1)),
+    "active leases": (ACTIVE_LEASES_SQL, (0,)),
+}
+
+def explain_dashboard_queries():
+    """Returns {query name: (EXPLAIN QUERY PLAN lines, full scans of applications)} for DASHBOARD_QUERIES."""
+    cursor = get_connection().cursor()
+    plans = {}
+    for name, (sql, params) in DASHBOARD_QUERIES.items():
+        details = [row[3] for row in cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+        full_scans = [detail for detail in details
+                      if re.match(r"SCAN (applications|a)\b", detail) and "INDEX" not in detail]
+        plans[name] = (details, full_scans)
+    return plans
+
+def build_skill_vocabulary(*skill_set_groups):
+    """Assigns one column index to every distinct skill across the given groups of skill sets."""
+    vocabulary = {}
+    for skill_sets in skill_set_groups:
+        for skills in skill_sets:
+            for skill in skills:
+                vocabulary.setdefault(skill, len(vocabulary))
+    return vocabulary
+
+def skill_matrix(skill_sets, vocabulary):
+    """Encodes skill sets as a sparse binary CSR matrix with one row per set."""
+    indptr = [0]
+    indices = []
+    for skills in skill_sets:
+        indices.extend(vocabulary[skill] for skill in skills if skill in vocabulary)
+        indptr.append(len(indices))
+    from scipy import sparse
+    data = np.ones(len(indices), dtype=np.float64)
+    return sparse.csr_matrix((data, indices, indptr), shape=(len(indptr) - 1, len(vocabulary)))
+
+def _inverse(values):
+    """Element-wise 1/x that maps empty (zero) rows to zero instead of inf."""
+    values = np.asarray(values, dtype=np.float64).ravel()
+    inverse = np.zeros_like(values)
+    np.divide(1.0, values, out=inverse, where=values > 0)
+    return inverse
+
+def pairwise_scores(resume_skill_sets, job_skill_sets):
+    """Scores every (resume, job) pair with a few sparse matrix products.
+
+    Returns two sparse (n_resumes x n_jobs) matrices on a 0-100 scale: the share of
+    each job's skills covered by the resume (the match score) and the cosine
+    similarity of the two binary skill vectors.
+    """
+    from scipy import sparse
+    vocabulary = build_skill_vocabulary(job_skill_sets, resume_skill_sets)
+    resumes = skill_matrix(resume_skill_sets, vocabulary)
+    jobs = skill_matrix(job_skill_sets, vocabulary)
+    overlap = (resumes @ jobs.T).tocsr()
+    resume_sizes = resumes.sum(axis=1)
+    job_sizes = jobs.sum(axis=1)
+    coverage = overlap @ sparse.diags(_inverse(job_sizes) * 100)
+    similarity = sparse.diags(_inverse(np.sqrt(resume_sizes))) @ overlap @ sparse.diags(_inverse(np.sqrt(job_sizes)) * 100)
+    return coverage.tocsr(), similarity.tocsr()
+
+def aligned_scores(resume_skill_sets, job_skill_sets):
+    """Scores each resume against the job at the same position, in one vectorized call.
+
+    Returns dense arrays of match scores (job skill coverage) and cosine
+    similarities, both on a 0-100 scale.
+    """
+    vocabulary = build_skill_vocabulary(job_skill_sets, resume_skill_sets)
+    resumes = skill_matrix(resume_skill_sets, vocabulary)
+    jobs = skill_matrix(job_skill_sets, vocabulary)
+    overlap = np.asarray(resumes.multiply(jobs).sum(axis=1)).ravel()
+    resume_sizes = np.asarray(resumes.sum(axis=1)).ravel()
+    job_sizes = np.asarray(jobs.sum(axis=1)).ravel()
+    coverage = overlap * _inverse(job_sizes) * 100
+    similarity = overlap * _inverse(np.sqrt(resume_sizes * job_sizes)) * 100
+    return coverage, similarity
+
+def skills_from_doc(doc):
+    """Returns the noun and proper-noun tokens of a parsed document as a skill set."""
+    return {token.text for token in doc if token.pos_ in {"NOUN", "PROPN"}}
+
+def extract_skills_pos(texts, batch_size=NLP_BATCH_SIZE, n_process=NLP_N_PROCESS):
+    """Streams many texts through the spaCy tagger and keeps every noun as a skill."""
+    nlp = load_nlp()
+    disabled = [name for name in NLP_DISABLED_COMPONENTS if name in nlp.pipe_names]
+    docs = nlp.pipe((str(text or "").lower() for text in texts), batch_size=batch_size, n_process=n_process, disable=disabled)
+    return [skills_from_doc(doc) for doc in docs]
+
+# Built-in skill lexicon: each entry is a skill followed by the other phrases that mean it
+DEFAULT_SKILL_LEXICON = (
+    "python", "java", "javascript, js, ecmascript", "typescript", "c++, cpp", "c#, csharp", "golang, go language", "rust",
+    "ruby", "php", "scala", "kotlin", "swift", "r programming, rstats", "matlab", "perl", "bash, shell scripting",
+    "powershell", "sql", "nosql", "html", "css", "sass",
+    "react, react.js, reactjs", "angular", "vue, vue.js", "node.js, nodejs", "django", "flask", "fastapi",
+    "spring boot, spring framework", ".net, dotnet", "ruby on rails", "express.js, expressjs", "graphql", "rest api, restful api",
+    "postgresql, postgres", "mysql", "sqlite", "oracle", "sql server, mssql", "mongodb", "redis", "cassandra",
+    "elasticsearch", "snowflake", "bigquery", "redshift", "data warehousing, data warehouse",
+    "aws, amazon web services", "azure, microsoft azure", "gcp, google cloud, google cloud platform", "docker",
+    "kubernetes, k8s", "terraform", "ansible", "jenkins", "ci/cd, continuous integration, continuous delivery",
+    "git, github, gitlab", "linux", "unix", "networking", "microservices", "devops", "site reliability engineering, sre",
+    "machine learning, ml", "deep learning", "artificial intelligence, ai", "natural language processing, nlp",
+    "computer vision", "data science", "data analysis, data analytics", "data engineering", "data visualization",
+    "statistics, statistical analysis", "big data", "etl", "spark, apache spark, pyspark", "hadoop", "kafka, apache kafka",
+    "airflow, apache airflow", "pandas", "numpy", "scikit-learn, sklearn", "tensorflow", "pytorch", "keras", "spacy",
+    "tableau", "power bi", "excel, microsoft excel", "looker",
+    "cybersecurity, information security", "penetration testing", "cryptography",
+    "unit testing", "test automation", "selenium", "quality assurance, qa",
+    "agile", "scrum", "kanban", "jira", "project management", "product management", "stakeholder management",
+    "business analysis", "requirements gathering", "technical writing", "ux design, user experience",
+    "ui design, user interface design", "figma", "communication skills, communication", "leadership",
+    "problem solving", "teamwork, collaboration", "customer service", "sales", "marketing", "digital marketing",
+    "seo, search engine optimization", "content writing", "accounting", "financial analysis", "budgeting",
+    "bookkeeping", "payroll", "recruitment, recruiting", "human resources, hr", "negotiation", "public speaking",
+    "mobile development", "android", "ios", "embedded systems", "firmware", "blockchain",
+)
+
+def load_skill_lexicon():
+    """Returns {skill: [phrases]} read from ATS_SKILL_LEXICON, or from DEFAULT_SKILL_LEXICON."""
+    entries = DEFAULT_SKILL_LEXICON
+    if SKILL_LEXICON_PATH:
+        with open(SKILL_LEXICON_PATH, encoding="utf-8") as f:
+            entries = [line for line in f if line.strip() and not line.lstrip().startswith("#")]
+    lexicon = {}
+    for entry in entries:
+        phrases = [" ".join(phrase.lower().split()) for phrase in entry.split(",") if phrase.strip()]
+        lexicon[phrases[0]] = phrases
+    return lexicon
+
+def skill_match_text(text):
+    """Lowercases text and reads hyphens as spaces, so "deep-learning" matches "deep learning"."""
+    return str(text or "").lower().replace("-", " ")
+
+def extract_skills_lexicon(texts, batch_size=NLP_BATCH_SIZE, n_process=NLP_N_PROCESS):
+    """Finds the skill lexicon's phrases, multi-word ones included, in one tokenizer pass per text.
+
+    No tagger runs, and only known skills are returned, named by their lexicon
+    entry, so filler nouns such as "team" or "experience" never count.
+    """
+    from spacy.util import filter_spans
+    nlp, matcher = load_skill_matcher()
+    skill_sets = []
+    for doc in nlp.tokenizer.pipe((skill_match_text(text) for text in texts), batch_size=batch_size):
+        # Of overlapping matches the longest wins, so "spring boot" is not also "spring"
+        skill_sets.append({span.label_ for span in filter_spans(matcher(doc, as_spans=True))})
+    return skill_sets
+
+# Skill extraction backends, selected with ATS_SKILL_EXTRACTOR
+SKILL_EXTRACTORS = {"lexicon": extract_skills_lexicon, "pos": extract_skills_pos}
+
+def extract_skills_batch(texts, batch_size=NLP_BATCH_SIZE, n_process=NLP_N_PROCESS):
+    """Returns one skill set per text from the configured SKILL_EXTRACTOR backend."""
+    return SKILL_EXTRACTORS[SKILL_EXTRACTOR](texts, batch_size=batch_size, n_process=n_process)
+
+def skill_extractor_key():
+    """Names the configured extractor, and its model or lexicon, as recorded against stored skills."""
+    if SKILL_EXTRACTOR not in SKILL_EXTRACTORS:
+        raise ValueError(f"Unknown skill extractor {SKILL_EXTRACTOR!r}; expected one of {list(SKILL_EXTRACTORS)}.")
+    if SKILL_EXTRACTOR == "pos":
+        return f"pos:{NLP_MODEL}"
+    return "lexicon:" + text_hash(json.dumps(load_skill_lexicon(), sort_keys=True))[:16]
+
+RECORDED_SKILL_EXTRACTOR_SQL = "SELECT value FROM settings WHERE key = 'skill_extractor'"
+
+def sync_skill_extractor():
+    """Forgets stored skills when the extractor or lexicon that produced them has changed.
+
+    Skills are memoized per text, so skills from another extractor would
+    otherwise be mixed with new ones. They are re-extracted on demand, or all
+    at once with `python -m ats migrate --backfill skills scores`.
+    """
+    conn = get_connection()
+    current = skill_extractor_key()
+    row = conn.execute(RECORDED_SKILL_EXTRACTOR_SQL).fetchone()
+    if row and row[0] == current:
+        return
+    with conn:
+        conn.execute("UPDATE resumes SET skills = NULL WHERE skills IS NOT NULL")
+        conn.execute("DELETE FROM job_skills")
+        conn.execute("DELETE FROM job_skill_index")
+        conn.execute("DELETE FROM application_skill_index")
+        conn.execute("INSERT INTO settings (key, value) VALUES ('skill_extractor', ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                     (current,))
+    job_skill_lru().discard(lambda key: True)
+    print(f"Skill extractor changed from {row[0] if row else 'none'} to {current}; stored skills will be re-extracted.")
 
 def extract_skills_from_text(text):
     """Extracts only relevant skills from the provided text (resume or job description)."""
-    doc = nlp(text.lower())
-    extracted_skills = {token.text for token in doc if token.pos_ in {"NOUN", "PROPN"}}
-    return extracted_skills
-
-def generate_pdf(name, email, title, match_score, missing_skills, feedback):
-    if not os.path.exists("feedback_reports"):
-        os.makedirs("feedback_reports")
-    file_path = os.path.join("feedback_reports", f"{name}_Feedback.pdf")
-    c = canvas.Canvas(file_path, pagesize=letter)
+    return extract_skills_batch([text], n_process=1)[0]
+
+def save_resume(resume_text):
+    """Stores a resume's text in resumes unless an identical copy is already there; returns its hash (caller commits)."""
+    resume_hash = text_hash(resume_text)
+    get_connection().execute("INSERT OR IGNORE INTO resumes (resume_hash, resume) VALUES (?, ?)", (resume_hash, str(resume_text or "")))
+    return resume_hash
+
+def extract_application_skills(applications, batch_size=NLP_BATCH_SIZE, n_process=NLP_N_PROCESS):
+    """Extracts resume skills for a DataFrame of applications in one batched pass.
+
+    Skills are memoized per resume hash in resumes: a resume submitted to
+    several jobs is parsed once, and only distinct resumes without stored
+    skills reach spaCy. Returns a dict mapping applicant_id to skill set.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    if applications.empty:
+        return {}
+    applicant_ids = [int(applicant_id) for applicant_id in applications["applicant_id"]]
+    resume_hashes = [text_hash(resume) for resume in applications["resume"]]
+    resumes = dict(zip(resume_hashes, applications["resume"]))
+    known = {}
+    hashes = list(resumes)
+    for start in range(0, len(hashes), 500):
+        chunk = hashes[start:start + 500]
+        placeholders = ", ".join("?" * len(chunk))
+        known.update((resume_hash, set(json.loads(skills))) for resume_hash, skills in cursor.execute(
+            f"SELECT resume_hash, skills FROM resumes WHERE skills IS NOT NULL AND resume_hash IN ({placeholders})", chunk))
+    new_hashes = [resume_hash for resume_hash in hashes if resume_hash not in known]
+    parsed = extract_skills_batch([resumes[resume_hash] for resume_hash in new_hashes], batch_size=batch_size, n_process=n_process)
+    known.update(zip(new_hashes, parsed))
+    cursor.executemany(
+        """
+        INSERT INTO resumes (resume_hash, resume, skills) VALUES (?, ?, ?)
+        ON CONFLICT (resume_hash) DO UPDATE SET skills = excluded.skills
+        """,
+        [(resume_hash, str(resumes[resume_hash] or ""), json.dumps(sorted(known[resume_hash]))) for resume_hash in new_hashes],
+    )
+    cursor.executemany(
+        """
+        INSERT INTO application_resumes (applicant_id, resume_hash) VALUES (?, ?)
+        ON CONFLICT (applicant_id) DO UPDATE SET resume_hash = excluded.resume_hash
+        """,
+        list(zip(applicant_ids, resume_hashes)),
+    )
+    skill_sets = [set(known[resume_hash]) for resume_hash in resume_hashes]
+    cursor.executemany("INSERT OR IGNORE INTO application_skill_index (skill, applicant_id) VALUES (?, ?)",
+                       [(skill, applicant_id) for applicant_id, skills in zip(applicant_ids, skill_sets) for skill in skills])
+    conn.commit()
+    return dict(zip(applicant_ids, skill_sets))
+
+def store_application_skills(applicant_id, resume_text):
+    """Extracts and saves the skills of a newly submitted resume."""
+    applications = pd.DataFrame({"applicant_id": [applicant_id], "resume": [resume_text]})
+    return extract_application_skills(applications, n_process=1)[int(applicant_id)]
+
+def load_application_skills(applicant_ids, batch_size=NLP_BATCH_SIZE, n_process=NLP_N_PROCESS):
+    """Returns {applicant_id: skills} from the precomputed application_skills table.
+
+    Applications submitted before skills were stored are extracted once, in a
+    single batch, and saved so later calls never parse those resumes again.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    applicant_ids = list(dict.fromkeys(int(applicant_id) for applicant_id in applicant_ids))
+    skill_sets = {}
+    for start in range(0, len(applicant_ids), 500):
+        chunk = applicant_ids[start:start + 500]
+        placeholders = ", ".join("?" * len(chunk))
+        rows = cursor.execute(f"SELECT applicant_id, skills FROM application_skills WHERE applicant_id IN ({placeholders})", chunk).fetchall()
+        skill_sets.update((applicant_id, set(json.loads(skills))) for applicant_id, skills in rows)
+
+    missing = [applicant_id for applicant_id in applicant_ids if applicant_id not in skill_sets]
+    for start in range(0, len(missing), 500):
+        chunk = missing[start:start + 500]
+        placeholders = ", ".join("?" * len(chunk))
+        resumes = pd.read_sql(
+            f"""
+            SELECT a.applicant_id, COALESCE(r.resume, '') AS resume
+            FROM applications a
+            LEFT JOIN application_resumes ar ON ar.applicant_id = a.applicant_id
+            LEFT JOIN resumes r ON r.resume_hash = ar.resume_hash
+            WHERE a.applicant_id IN ({placeholders})
+            """,
+            conn,
+            params=chunk,
+        )
+        skill_sets.update(extract_application_skills(resumes, batch_size=batch_size, n_process=n_process))
+    return skill_sets
+
+class LRUCache:
+    """A small in-process least-recently-used cache."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+
+    def get(self, key, default=None):
+        if key not in self.data:
+            return default
+        self.data.move_to_end(key)
+        return self.data[key]
+
+    def put(self, key, value):
+        self.data[key] = value
+        self.data.move_to_end(key)
+        while len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    def discard(self, predicate):
+        """Drops every entry whose key matches the predicate."""
+        for key in [key for key in self.data if predicate(key)]:
+            del self.data[key]
+
+def text_hash(text):
+    """Returns a stable SHA-256 hex digest of a piece of text."""
+    return hashlib.sha256(str(text or "").encode("utf-8")).hexdigest()
+
+def write_file_atomically(path, data):
+    """Writes bytes to path through a temporary file, so readers never see a partial file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+def resume_format(data):
+    """Detects an uploaded resume's format from its leading bytes rather than its file name."""
+    if data.startswith(b"%PDF-"):
+        return "pdf"
+    if data.startswith(b"PK\x03\x04"):
+        return "docx"
+    return "txt"
+
+def extract_pdf_text(data, max_pages=RESUME_MAX_PAGES):
+    """Returns the text layer of the first `max_pages` pages of a PDF."""
+    # pypdf is only needed when a PDF is uploaded
+    from pypdf import PdfReader
+    reader = PdfReader(io.BytesIO(data))
+    return "\n".join(page.extract_text() or "" for page in reader.pages[:max_pages])
+
+def extract_docx_text(data):
+    """Returns the paragraphs of a .docx file, read straight from its document XML."""
+    with zipfile.ZipFile(io.BytesIO(data)) as docx:
+        # A tiny upload can inflate to an enormous document
+        if docx.getinfo("word/document.xml").file_size > 10 * RESUME_MAX_BYTES:
+            raise ValueError("The document is too large to read.")
+        root = ElementTree.fromstring(docx.read("word/document.xml"))
+    namespace = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+    return "\n".join("".join(node.text or "" for node in paragraph.iter(f"{namespace}t"))
+                     for paragraph in root.iter(f"{namespace}p"))
+
+RESUME_EXTRACTORS = {
+    "pdf": extract_pdf_text,
+    "docx": extract_docx_text,
+    "txt": lambda data: data.decode("utf-8", errors="ignore"),
+}
+
+def normalize_resume_text(text, max_chars=RESUME_MAX_CHARS):
+    """Collapses runs of whitespace, drops blank lines and caps the text at `max_chars` characters."""
+    lines = (" ".join(line.split()) for line in str(text or "").replace("\x00", " ").splitlines())
+    return "\n".join(line for line in lines if line)[:max_chars]
+
+def resume_blob_path(upload_hash):
+    """Returns the content-addressed path of an uploaded resume file."""
+    return os.path.join(RESUME_BLOB_DIR, upload_hash[:2], upload_hash)
+
+def ingest_resume(data):
+    """Stores an uploaded resume file and returns (upload_hash, text).
+
+    The raw bytes go to the blob store under their SHA-256, and resume_uploads
+    maps that hash to the extracted, normalized text in resumes, so a file
+    uploaded again is never parsed twice. Raises ValueError for oversized files.
+    """
+    if len(data) > RESUME_MAX_BYTES:
+        raise ValueError(f"Resume files must be smaller than {RESUME_MAX_BYTES // (1024 * 1024)} MB.")
+    upload_hash = hashlib.sha256(data).hexdigest()
+    conn = get_connection()
+    row = conn.execute(
+        "SELECT r.resume FROM resume_uploads u JOIN resumes r ON r.resume_hash = u.resume_hash WHERE u.upload_hash = ?",
+        (upload_hash,),
+    ).fetchone()
+    if row:
+        return upload_hash, row[0]
+    resume_type = resume_format(data)
+    text = normalize_resume_text(RESUME_EXTRACTORS[resume_type](data))
+    path = resume_blob_path(upload_hash)
+    if not os.path.exists(path):
+        write_file_atomically(path, data)
+    conn.execute("INSERT OR IGNORE INTO resume_uploads (upload_hash, format, size, resume_hash, uploaded_on) VALUES (?, ?, ?, ?, ?)",
+                 (upload_hash, resume_type, len(data), save_resume(text), datetime.now().isoformat(timespec="seconds")))
+    conn.commit()
+    return upload_hash, text
+
+@st.cache_resource
+def job_skill_lru():
+    """Process-wide LRU in front of the job_skills table, kept across Streamlit reruns."""
+    return LRUCache(JOB_SKILL_CACHE_SIZE)
+
+def load_job_skills(jobs):
+    """Returns {job_id: skills} for (job_id, description) pairs.
+
+    Skills are served from the in-process LRU, then the job_skills table; only
+    descriptions missing from both are parsed with spaCy, in a single batch.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    lru = job_skill_lru()
+    skill_sets = {}
+    misses = []
+    for job_id, description in jobs:
+        key = (int(job_id), text_hash(description))
+        skills = lru.get(key)
+        if skills is None:
+            row = cursor.execute("SELECT skills FROM job_skills WHERE job_id = ? AND description_hash = ?", key).fetchone()
+            if row:
+                skills = frozenset(json.loads(row[0]))
+                lru.put(key, skills)
+        if skills is None:
+            misses.append((key, description))
+        else:
+            skill_sets[key[0]] = skills
+
+    if misses:
+        parsed = extract_skills_batch([description for _, description in misses])
+        for (key, _), skills in zip(misses, parsed):
+            skills = frozenset(skills)
+            cursor.execute("INSERT OR REPLACE INTO job_skills (job_id, description_hash, skills) VALUES (?, ?, ?)",
+                           (key[0], key[1], json.dumps(sorted(skills))))
+            # An edited description supersedes the cached skills of the old one
+            cursor.execute("DELETE FROM job_skills WHERE job_id = ? AND description_hash != ?", key)
+            index_job_skills(key[0], skills)
+            lru.put(key, skills)
+            skill_sets[key[0]] = skills
+        conn.commit()
+    return skill_sets
+
+def get_job_skills(job_id, description):
+    """Returns the cached skill set of a single job description."""
+    return load_job_skills([(job_id, description)])[int(job_id)]
+
+def index_job_skills(job_id, skills):
+    """Replaces a job's rows in the skill -> job inverted index (caller commits)."""
+    cursor = get_connection().cursor()
+    cursor.execute("DELETE FROM job_skill_index WHERE job_id = ?", (int(job_id),))
+    cursor.executemany("INSERT INTO job_skill_index (job_id, skill) VALUES (?, ?)", [(int(job_id), skill) for skill in skills])
+
+def forget_job_skills(job_id):
+    """Removes a deleted job from the job skill cache."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM job_skills WHERE job_id = ?", (int(job_id),))
+    cursor.execute("DELETE FROM job_skill_index WHERE job_id = ?", (int(job_id),))
+    conn.commit()
+    job_skill_lru().discard(lambda key: key[0] == int(job_id))
+
+class ReportCache(LRUCache):
+    """Rendered PDF bytes keyed by artifact path, bounded by total size.
+
+    Every report is also written to its content-addressed path, so the outbox
+    can send it after a restart or from another process; the in-memory copy
+    saves re-reading it while it is hot.
+    """
+
+    def __init__(self, max_bytes):
+        super().__init__(maxsize=None)
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            return super().get(key, default)
+
+    def put(self, key, value):
+        with self.lock:
+            if key in self.data:
+                self.size -= len(self.data[key])
+            self.data[key] = value
+            self.data.move_to_end(key)
+            self.size += len(value)
+            while self.size > self.max_bytes and len(self.data) > 1:
+                _, evicted = self.data.popitem(last=False)
+                self.size -= len(evicted)
+
+    def discard(self, predicate):
+        with self.lock:
+            for key in [key for key in self.data if predicate(key)]:
+                self.size -= len(self.data.pop(key))
+
+    def store(self, path, data):
+        """Caches a rendered report and spills it to disk unless it is already there."""
+        if not os.path.exists(path):
+            write_file_atomically(path, data)
+        self.put(path, data)
+
+    def read(self, path):
+        """Returns a report's bytes from memory, falling back to its file on disk."""
+        data = self.get(path)
+        if data is None:
+            with open(path, "rb") as f:
+                data = f.read()
+            self.put(path, data)
+        return data
+
+@st.cache_resource
+def report_cache():
+    """Process-wide cache of rendered feedback reports, kept across Streamlit reruns."""
+    return ReportCache(REPORT_CACHE_BYTES)
+
+def report_key(applicant_id, name, email, title, match_score, missing_skills, feedback):
+    """Content hash of everything that appears in a feedback report."""
+    return text_hash(json.dumps(
+        [int(applicant_id), name, email, title, round(float(match_score), 2), sorted(missing_skills), feedback]
+    ))
+
+def report_path(applicant_id, key):
+    """Feedback report location: sharded by applicant_id, named by the report's content hash."""
+    applicant_id = int(applicant_id)
+    return os.path.join(REPORT_DIR, f"{applicant_id % REPORT_SHARDS:02x}", f"{applicant_id}_{key}.pdf")
+
+def generate_pdf(applicant_id, name, email, title, match_score, missing_skills, feedback):
+    """Returns the path of the applicant's feedback report, rendering it only if these inputs are new."""
+    report = (applicant_id, name, email, title, match_score, missing_skills, feedback)
+    file_path = report_path(applicant_id, report_key(*report))
+    if not os.path.exists(file_path):
+        # The file may have been swept while its bytes were still cached here
+        cache = report_cache()
+        data = cache.get(file_path)
+        cache.store(file_path, render_pdf(*report) if data is None else data)
+    return file_path
+
+def render_pdf(applicant_id, name, email, title, match_score, missing_skills, feedback):
+    """Renders a feedback report into memory and returns the PDF bytes."""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
     c.setFont("Helvetica-Bold", 14)
     c.drawString(200, 750, "Application Feedback Report")
     c.setFont("Helvetica", 12)
@@ -241,16 +1389,124 @@ def generate_pdf(name, email, title, match_score, missing_skills, feedback):
     c.setFont("Helvetica", 11)
     c.drawString(120, y_position - 40, feedback)
     c.save()
-    return file_path
+    return buffer.getvalue()
+
+def _render_report(report):
+    return render_pdf(*report)
+
+def render_reports(reports, max_workers=1):
+    """Returns feedback report paths for a batch of generate_pdf argument tuples, in order.
+
+    Reports already in the cache or on disk are reused as they are; the rest
+    are rendered, spread over a process pool when there are enough of them and
+    max_workers > 1. Only the CLI processes pass max_workers: the Streamlit
+    server runs other threads, so it renders in-process rather than start one.
+    """
+    reports = list(reports)
+    paths = [report_path(report[0], report_key(*report)) for report in reports]
+    cache = report_cache()
+    missing = {}
+    for path, report in zip(paths, reports):
+        if path not in missing and not os.path.exists(path):
+            data = cache.get(path)
+            if data is None:
+                missing[path] = report
+            else:
+                cache.store(path, data)  # swept from disk, still cached here
+    if not missing:
+        return paths
+
+    pending = list(missing.values())
+    rendered = None
+    if len(pending) >= REPORT_PARALLEL_THRESHOLD and max_workers > 1:
+        chunksize = max(1, len(pending) // (max_workers * 4))
+        # Fresh interpreters, not forks, so no child inherits a lock held by another thread
+        start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(start_method)) as executor:
+                rendered = list(executor.map(_render_report, pending, chunksize=chunksize))
+        except (pickle.PicklingError, BrokenProcessPool) as e:
+            print(f"Parallel report rendering unavailable ({e}); rendering sequentially.")
+    if rendered is None:
+        rendered = [render_pdf(*report) for report in pending]
+    for path, data in zip(missing, rendered):
+        cache.store(path, data)
+    return paths
+
+def sweep_reports(min_age=REPORT_SWEEP_MIN_AGE):
+    """Deletes report files that no application points at and no queued or sending email attaches.
+
+    Reports are named by their content, so a rescore or a new feedback text
+    writes a new file and leaves the old one behind. Files younger than
+    `min_age` are kept: a batch renders its reports before saving their paths.
+    Returns the number of files deleted.
+    """
+    if not os.path.isdir(REPORT_DIR):
+        return 0
+    referenced = {os.path.normpath(path) for (path,) in get_connection().execute(
+        """
+        SELECT pdf_report FROM applications WHERE pdf_report IS NOT NULL
+        UNION SELECT attachment_path FROM outbox WHERE status IN ('queued', 'sending') AND attachment_path IS NOT NULL
+        """
+    )}
+    cutoff = time.time() - min_age
+    deleted = set()
+    for shard in os.scandir(REPORT_DIR):
+        if not shard.is_dir():
+            continue
+        for entry in os.scandir(shard.path):
+            path = os.path.normpath(entry.path)
+            if entry.name.endswith(".pdf") and path not in referenced and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                deleted.add(path)
+    report_cache().discard(lambda key: os.path.normpath(key) in deleted)
+    return len(deleted)
+
+def record_report_paths(applicant_ids, paths, commit=True):
+    """Points applications.pdf_report at each applicant's current report."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.executemany(
+        "UPDATE applications SET pdf_report = ? WHERE applicant_id = ?",
+        [(path, int(applicant_id)) for applicant_id, path in zip(applicant_ids, paths)],
+    )
+    if commit:
+        conn.commit()
+
+def load_jobs(job_ids):
+    """Returns job_id, title and description for the given jobs."""
+    conn = get_connection()
+    job_ids = sorted({int(job_id) for job_id in job_ids if pd.notna(job_id)})
+    if not job_ids:
+        return pd.DataFrame(columns=["job_id", "title", "description"])
+    placeholders = ", ".join("?" * len(job_ids))
+    return pd.read_sql(f"SELECT job_id, title, description FROM jobs WHERE job_id IN ({placeholders})", conn, params=job_ids)
+
+def build_feedback_reports(applications):
+    """Builds generate_pdf arguments for screened applications from their stored score and feedback."""
+    if applications.empty:
+        return []
+    jobs = load_jobs(applications["job_id"])
+    job_titles = dict(zip(jobs["job_id"], jobs["title"]))
+    job_skill_sets = load_job_skills(zip(jobs["job_id"], jobs["description"]))
+    resume_skill_sets = load_application_skills(applications["applicant_id"])
+    reports = []
+    for _, row in applications.iterrows():
+        missing_skills = job_skill_sets.get(row["job_id"], frozenset()) - resume_skill_sets[row["applicant_id"]]
+        reports.append((int(row["applicant_id"]), row["name"], row["email"], job_titles.get(row["job_id"], ""),
+                        row["match_score"], missing_skills, row["feedback"]))
+    return reports
 
 def process_application(applicant_id):
     """Process a single applicant's job application."""
-    cursor.execute("SELECT name, email, job_id, resume FROM applications WHERE applicant_id = ?", (applicant_id,))
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT name, email, job_id FROM applications WHERE applicant_id = ?", (applicant_id,))
     applicant_data = cursor.fetchone()
     if not applicant_data:
         print(f"No application found for applicant ID {applicant_id}.")
         return
-    name, email, job_id, resume_text = applicant_data
+    name, email, job_id = applicant_data
     # Fetch the specific job description for the job applied for
     cursor.execute("SELECT title, description FROM jobs WHERE job_id = ?", (job_id,))
     job_data = cursor.fetchone()
@@ -259,95 +1515,729 @@ def process_application(applicant_id):
         return
     job_title, job_description = job_data
     # Extract skills from job description and resume
-    job_skills = extract_skills_from_text(job_description)
-    resume_skills = extract_skills_from_text(resume_text)
+    job_skills = get_job_skills(job_id, job_description)
+    if not job_skills:
+        print(f"No skills found in the description of job ID {job_id}; leaving application {applicant_id} for manual review.")
+        return
+    resume_skills = load_application_skills([applicant_id])[int(applicant_id)]
     # Calculate match score and determine missing skills
     missing_skills = job_skills - resume_skills
-    match_score = (len(matched_skills) / len(job_skills)) * 100 if job_skills else 0
+    match_score = aligned_scores([resume_skills], [job_skills])[0][0]
     # Generate feedback based on match score
-    if match_score >= 50:
+    if match_score >= SCREENING_PASS_SCORE:
         status = 'Success'
         feedback = f"Congratulations! Your application matched with a score of {match_score:.2f}%."
     else:
         status = 'Rejected'
         feedback = f"Unfortunately, \n\n your application did not mieet our requirements due to missing key skills: {', '.join(missing_skills)}."
     # Generate and send PDF feedback
-    pdf_path = generate_pdf(name, email, job_title, match_score, missing_skills, feedback, chart_path)
-    send_email_with_pdf(name, email, pdf_path)
+    pdf_path = generate_pdf(applicant_id, name, email, job_title, match_score, missing_skills, feedback)
+    deliver_outbox([send_email_with_pdf(name, email, pdf_path, applicant_id=applicant_id)])
     # Update application status in the database
-    cursor.execute("UPDATE applications SET status=?, feedback=?, match_score=? WHERE applicant_id=?", (status, feedback, match_score, applicant_id))
+    cursor.execute("UPDATE applications SET status=?, feedback=?, match_score=?, pdf_report=? WHERE applicant_id=?", (status, feedback, match_score, pdf_path, applicant_id))
     conn.commit()
     
-def send_email_with_pdf(name, email, pdf_path):
-    sender_email = "nguaemmanuel190@gmail.com"
-    sender_password = "vyok ebpu lctf xupr"
-    subject = "Your Application Feedback Report"
-    body = f"Hello {name},\n\nAttached is your application feedback report.\n\nBest regards,\nHT.co.ke"
-    
+class RecordingSMTP(smtplib.SMTP):
+    """smtplib.SMTP that remembers the server's reply to the last DATA command."""
+    last_response = ""
+
+    def data(self, msg):
+        code, response = super().data(msg)
+        self.last_response = f"{code} {response.decode('utf-8', 'replace')}"
+        return code, response
+
+def mail_settings_problem():
+    """Returns why outbound mail cannot be sent with the configured credentials, or None."""
+    if not SENDER_EMAIL:
+        return "Outbound email is not configured: set ATS_SENDER_EMAIL (and ATS_SENDER_PASSWORD)."
+    if SMTP_STARTTLS and not SENDER_PASSWORD:
+        return ("Outbound email is not configured: set ATS_SENDER_PASSWORD, or ATS_SMTP_STARTTLS=0 "
+                "to send through a local server without logging in.")
+    return None
+
+class SMTPSender:
+    """Sends many messages over one authenticated SMTP connection, with rate limiting."""
+
+    def __init__(self, host=SMTP_SERVER, port=SMTP_PORT, username=SENDER_EMAIL, password=SENDER_PASSWORD,
+                 starttls=SMTP_STARTTLS, rate_limit=MAIL_RATE_LIMIT):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.rate_limit = rate_limit
+        self.server = None
+        self.last_sent = 0.0
+
+    def connect(self):
+        self.server = RecordingSMTP(self.host, self.port, timeout=MAIL_TIMEOUT)
+        if self.starttls:
+            self.server.starttls()
+        if self.password:
+            self.server.login(self.username, self.password)
+
+    def send(self, msg):
+        """Sends one message, reconnecting once if the server dropped the connection.
+
+        Returns the server's reply to the message data.
+        """
+        if self.rate_limit:
+            delay = self.last_sent + 1 / self.rate_limit - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        if self.server is None:
+            self.connect()
+        try:
+            self.server.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            self.close()
+            self.connect()
+            self.server.send_message(msg)
+        self.last_sent = time.monotonic()
+        return self.server.last_response
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass  # Connection already gone
+            self.server = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def enqueue_email(recipient, subject, body, attachment_path=None, attachment_name=None, applicant_id=None, template=None, commit=True):
+    """Adds a message to the outbox and returns its message_id."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    if attachment_path and not attachment_name:
+        attachment_name = os.path.basename(attachment_path)
+    cursor.execute(
+        """
+        INSERT INTO outbox (recipient, subject, body, attachment_path, attachment_name, applicant_id, template, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (recipient, subject, body, attachment_path, attachment_name,
+         None if applicant_id is None else int(applicant_id), template, datetime.now().isoformat(timespec="seconds")),
+    )
+    message_id = cursor.lastrowid
+    if commit:
+        conn.commit()
+    return message_id
+
+def claim_outbox(claim_id, message_ids=None, limit=MAIL_BATCH_SIZE, db=None):
+    """Leases due outbox messages (optionally only the given ones) to one sender."""
+    db = db or get_connection()
+    now = time.time()
+    id_filter = ""
+    params = [claim_id, now + MAIL_LEASE_SECONDS, now, now]
+    if message_ids is not None:
+        message_ids = [int(message_id) for message_id in message_ids]
+        if not message_ids:
+            return []
+        id_filter = f"AND message_id IN ({', '.join('?' * len(message_ids))})"
+        params.extend(message_ids)
+    params.append(limit)
+    db.execute(
+        f"""
+        UPDATE outbox SET status = 'sending', claimed_by = ?, next_attempt_at = ?
+        WHERE message_id IN (
+            SELECT message_id FROM outbox
+            WHERE ((status = 'queued' AND next_attempt_at <= ?) OR (status = 'sending' AND next_attempt_at < ?)) {id_filter}
+            ORDER BY message_id LIMIT ?
+        )
+        """,
+        params,
+    )
+    db.commit()
+    return db.execute(
+        """
+        SELECT message_id, recipient, subject, body, attachment_path, attachment_name, attempts, applicant_id, template
+        FROM outbox WHERE status = 'sending' AND claimed_by = ? ORDER BY message_id
+        """,
+        (claim_id,),
+    ).fetchall()
+
+def build_outbox_message(recipient, subject, body, attachment_path=None, attachment_name=None):
     msg = MIMEMultipart()
-    msg['From'] = sender_email
-    msg['To'] = email
-    msg['Subject'] = subject
-    msg.attach(MIMEText(body, 'plain'))
-    
-    with open(pdf_path, "rb") as attachment:
-        part = MIMEBase("application", "octet-stream")
-        part.set_payload(attachment.read())
-        encoders.encode_base64(part)
-        part.add_header("Content-Disposition", f"attachment; filename={os.path.basename(pdf_path)}")
+    msg["From"] = SENDER_EMAIL
+    msg["To"] = recipient
+    msg["Subject"] = subject
+    msg.attach(MIMEText(body, "plain"))
+    if attachment_path:
+        part = MIMEApplication(report_cache().read(attachment_path), Name=attachment_name)
+        part["Content-Disposition"] = f'attachment; filename="{attachment_name}"'
         msg.attach(part)
-    
+    return msg
+
+def smtp_error_response(error):
+    """Formats an SMTP exception as the server reply it carries, when there is one."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return "; ".join(f"{code} {reply.decode('utf-8', 'replace')}" for code, reply in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        reply = error.smtp_error.decode("utf-8", "replace") if isinstance(error.smtp_error, bytes) else error.smtp_error
+        return f"{error.smtp_code} {reply}"
+    return str(error)
+
+def _log_delivery(row, status, smtp_response, db):
+    message_id, recipient, applicant_id, template = row[0], row[1], row[7], row[8]
+    db.execute(
+        """
+        INSERT INTO email_deliveries (message_id, applicant_id, template, recipient, status, attempted_at, smtp_response)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        (message_id, applicant_id, template, recipient, status, datetime.now().isoformat(timespec="seconds"), smtp_response),
+    )
+
+def _record_sent(row, smtp_response, db):
+    db.execute(
+        "UPDATE outbox SET status = 'sent', attempts = attempts + 1, claimed_by = NULL, last_error = NULL, sent_at = ? WHERE message_id = ?",
+        (datetime.now().isoformat(timespec="seconds"), row[0]),
+    )
+    _log_delivery(row, "sent", smtp_response, db)
+    return "sent"
+
+def _record_failure(row, error, db, permanent=False):
+    """Schedules a retry with exponential backoff, or gives up after MAIL_MAX_ATTEMPTS."""
+    message_id, attempts = row[0], row[6] + 1
+    if permanent or attempts >= MAIL_MAX_ATTEMPTS:
+        status, next_attempt_at = "failed", 0
+    else:
+        status, next_attempt_at = "queued", time.time() + MAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+    response = smtp_error_response(error)
+    db.execute(
+        "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, claimed_by = NULL, last_error = ? WHERE message_id = ?",
+        (status, attempts, next_attempt_at, response, message_id),
+    )
+    _log_delivery(row, "failed" if status == "failed" else "deferred", response, db)
+    print(f"Error sending message {message_id}: {error}")
+    return status
+
+def deliver_outbox(message_ids=None, batch_size=MAIL_BATCH_SIZE, sender=None, db=None, results=None):
+    """Sends due outbox messages over one pooled SMTP connection.
+
+    Each message's delivery status is written back to the outbox; failures are
+    retried with exponential backoff. Returns {message_id: status} for the
+    messages attempted, filling `results` as it goes when one is passed in.
+    Without mail credentials nothing is claimed, so the messages stay queued.
+    """
+    problem = mail_settings_problem() if sender is None else None
+    if problem:
+        print(problem)
+        return {} if results is None else results
+    db = db or get_connection()
+    claim_id = f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+    results = {} if results is None else results
+    owns_sender = sender is None
+    sender = sender or SMTPSender()
     try:
-        with smtplib.SMTP("smtp.gmail.com", 587) as server:
-            server.starttls()
-            server.login(sender_email, sender_password)
-            server.sendmail(sender_email, email, msg.as_string())
-        print(f"Email sent successfully to {email}")
-    except Exception as e:
-        print(f"Error sending email to {email}: {e}")
-
-def screen_applications():
-    applications = pd.read_sql("SELECT name, email, job_id, resume FROM applications WHERE status='Under Review'", conn)
-    for _, row in applications.iterrows():
+        while True:
+            rows = claim_outbox(claim_id, message_ids, batch_size, db=db)
+            if not rows:
+                break
+            for index, row in enumerate(rows):
+                message_id, recipient, subject, body, attachment_path, attachment_name = row[:6]
+                try:
+                    msg = build_outbox_message(recipient, subject, body, attachment_path, attachment_name)
+                except OSError as e:
+                    results[message_id] = _record_failure(row, e, db, permanent=True)
+                    continue
+                try:
+                    smtp_response = sender.send(msg)
+                except smtplib.SMTPRecipientsRefused as e:
+                    results[message_id] = _record_failure(row, e, db, permanent=True)
+                except (smtplib.SMTPAuthenticationError, smtplib.SMTPConnectError, smtplib.SMTPServerDisconnected) as e:
+                    # The server is unusable, so every claimed message waits for its next attempt
+                    for pending in rows[index:]:
+                        results[pending[0]] = _record_failure(pending, e, db)
+                    db.commit()
+                    return results
+                except smtplib.SMTPException as e:
+                    results[message_id] = _record_failure(row, e, db)
+                except OSError as e:
+                    for pending in rows[index:]:
+                        results[pending[0]] = _record_failure(pending, e, db)
+                    db.commit()
+                    return results
+                else:
+                    results[message_id] = _record_sent(row, smtp_response, db)
+            db.commit()
+    finally:
+        if owns_sender:
+            sender.close()
+    return results
+
+class BulkDispatch:
+    """Handle for a batch of outbox messages being delivered by background threads."""
+
+    def __init__(self, recipients):
+        self.recipients = recipients  # {message_id: recipient}
+        self.results = {}  # {message_id: status}, filled in by the sender threads
+        self.futures = []
+        self.started = time.time()
+
+    def done(self):
+        return all(future.done() for future in self.futures)
+
+    def progress(self):
+        """Returns (messages attempted, messages in the batch)."""
+        return len(self.results), len(self.recipients)
+
+    def count(self, status):
+        return sum(1 for result in list(self.results.values()) if result == status)
+
+    def errors(self):
+        return [future.exception() for future in self.futures if future.done() and future.exception()]
+
+    def results_frame(self):
+        results = dict(self.results)
+        return pd.DataFrame(
+            [(recipient, results.get(message_id, "pending")) for message_id, recipient in self.recipients.items()],
+            columns=["Recipient", "Status"],
+        )
+
+@st.cache_resource
+def mail_executor():
+    """Process-wide thread pool that runs bulk mail dispatches, kept across reruns."""
+    return ThreadPoolExecutor(max_workers=MAIL_CONCURRENCY, thread_name_prefix="ats-mail")
+
+def dispatch_outbox(message_ids, concurrency=MAIL_CONCURRENCY):
+    """Starts delivering outbox messages over up to `concurrency` SMTP connections at once.
+
+    Returns a BulkDispatch handle straight away; callers poll it for progress
+    and per-recipient results.
+    """
+    cursor = get_connection().cursor()
+    message_ids = [int(message_id) for message_id in message_ids if message_id]
+    recipients = {}
+    for start in range(0, len(message_ids), 500):
+        chunk = message_ids[start:start + 500]
+        placeholders = ", ".join("?" * len(chunk))
+        recipients.update(cursor.execute(f"SELECT message_id, recipient FROM outbox WHERE message_id IN ({placeholders})", chunk).fetchall())
+    handle = BulkDispatch({message_id: recipients[message_id] for message_id in message_ids if message_id in recipients})
+    workers = max(1, min(concurrency, len(handle.recipients)))
+    queued = list(handle.recipients)
+    executor = mail_executor()
+    # Each pool thread delivers on its own connection from get_connection()
+    handle.futures = [executor.submit(deliver_outbox, queued[worker::workers], results=handle.results) for worker in range(workers)]
+    return handle
+
+def start_mail_dispatch(message_ids):
+    """Hands queued messages to the background senders and tracks the batch in the session.
+
+    Returns the number of messages dispatched.
+    """
+    handle = dispatch_outbox(message_ids)
+    st.session_state["mail_dispatch"] = handle
+    return len(handle.recipients)
+
+@st.fragment(run_every=2)
+def show_mail_dispatch():
+    """Progress panel for the session's latest bulk email batch, refreshed while it runs."""
+    handle = st.session_state.get("mail_dispatch")
+    if handle is None:
+        return
+    attempted, total = handle.progress()
+    st.progress(attempted / total if total else 1.0, text=f"📧 Emails processed: {attempted} of {total}")
+    if not handle.done():
+        return
+    sent, retrying, failed = handle.count("sent"), handle.count("queued"), handle.count("failed")
+    if sent:
+        st.success(f"📧 {sent} emails sent in {time.time() - handle.started:.1f}s.")
+    if retrying:
+        st.warning(f"⏳ {retrying} emails could not be sent yet and will be retried.")
+    if failed:
+        st.error(f"❌ {failed} emails could not be delivered.")
+    for error in handle.errors():
+        st.error(f"❌ Email sender stopped: {error}")
+    problem = mail_settings_problem()
+    if problem:
+        st.error(f"❌ {problem} The emails stay queued until it is.")
+    with st.expander("Delivery details"):
+        st.dataframe(handle.results_frame(), hide_index=True)
+    if st.button("Dismiss", key="dismiss_mail_dispatch"):
+        del st.session_state["mail_dispatch"]
+        st.rerun()
+
+def send_email_with_pdf(name, email, pdf_path, applicant_id=None, commit=True):
+    """Queues the feedback report email and returns its outbox message_id."""
+    subject = "Your Application Feedback Report"
+    body = f"Hello {name},\n\nAttached is your application feedback report.\n\nBest regards,\nHT.co.ke"
+    return enqueue_email(email, subject, body, attachment_path=pdf_path, attachment_name=f"{name}_Feedback.pdf",
+                         applicant_id=applicant_id, template="feedback_report", commit=commit)
+
+class ResultWriter:
+    """Collects per-application results and saves them with one executemany per transaction.
+
+    Rows are keyed by applicant_id; a column passed as None keeps its current
+    value. Use it as a context manager so the last partial batch is flushed.
+    """
+
+    UPDATE_SQL = """
+        UPDATE applications
+        SET status = COALESCE(?, status), feedback = COALESCE(?, feedback), match_score = COALESCE(?, match_score),
+            category = COALESCE(?, category), pdf_report = COALESCE(?, pdf_report),
+            lease_owner = NULL, lease_expires = NULL
+        WHERE applicant_id = ?
+    """
+
+    def __init__(self, batch_size=RESULT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.pending = []
+        self.written = 0
+
+    def add(self, applicant_id, status=None, feedback=None, match_score=None, category=None, pdf_report=None):
+        match_score = None if match_score is None else float(match_score)
+        self.pending.append((status, feedback, match_score, category, pdf_report, int(applicant_id)))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Writes the pending rows, and anything else uncommitted on this thread, in one transaction."""
+        if not self.pending:
+            return
+        conn = get_connection()
+        with conn:
+            conn.executemany(self.UPDATE_SQL, self.pending)
+        self.written += len(self.pending)
+        self.pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.flush()
+        else:
+            get_connection().rollback()
+        return False
+
+def screen_applications(batch_size=NLP_BATCH_SIZE, n_process=NLP_N_PROCESS):
+    """Screens every application that is still Under Review in one pass."""
+    conn = get_connection()
+    applications = pd.read_sql(UNDER_REVIEW_SQL, conn)
+    screen_batch(applications, batch_size=batch_size, n_process=n_process)
+    deliver_outbox()
+
+def screen_batch(applications, batch_size=NLP_BATCH_SIZE, n_process=NLP_N_PROCESS, report_workers=1):
+    """Scores a DataFrame of applications, sends their feedback reports and saves the results.
+
+    Applications that cannot be screened are moved to MANUAL_REVIEW_STATUS, without
+    an email, so they leave the queue. When rescreening (the DataFrame has a status
+    column), only applicants whose status changes are emailed. Returns the number
+    of applications screened.
+    """
+    if applications.empty:
+        return 0
+    # Job and resume skills are precomputed; only rows missing them are parsed, in one batch
+    jobs = load_jobs(applications["job_id"])
+    job_titles = dict(zip(jobs["job_id"], jobs["title"]))
+    job_skill_sets = load_job_skills(zip(jobs["job_id"], jobs["description"]))
+    resume_skill_sets = load_application_skills(applications["applicant_id"], batch_size=batch_size, n_process=n_process)
+
+    # Without a job, or without any skills in its description, every score would be 0
+    known_job = applications["job_id"].map(lambda job_id: bool(job_skill_sets.get(job_id)))
+    with ResultWriter() as writer:
+        for applicant_id, job_id in zip(applications.loc[~known_job, "applicant_id"], applications.loc[~known_job, "job_id"]):
+            reason = f"No skills found in the description of job ID {job_id}." if job_id in job_skill_sets else f"No job found for job ID {job_id}."
+            print(f"{reason} Moving application {applicant_id} to {MANUAL_REVIEW_STATUS}.")
+            writer.add(applicant_id, status=MANUAL_REVIEW_STATUS, feedback=reason)
+    applications = applications[known_job]
+    if applications.empty:
+        return 0
+    # Score the whole batch at once against each application's own job
+    match_scores, _ = aligned_scores(
+        [resume_skill_sets[applicant_id] for applicant_id in applications["applicant_id"]],
+        [job_skill_sets[job_id] for job_id in applications["job_id"]],
+    )
+
+    reports = []
+    results = []
+    for (_, row), match_score in zip(applications.iterrows(), match_scores):
         name = row["name"]
         email = row["email"]
         job_id = row["job_id"]
-        resume_text = row["resume"]
-        #Fetch the job description from the database
-        cursor.execute("SELECT description FROM jobs WHERE job_id = ?", (job_id,))
-        job_data = cursor.fetchone()
-
-        if not job_data:
-            print(f"No job found for job ID {job_id}. Skipping application.")
-            continue  
-
-        job_description = job_data[0]  # Extract job description text
-        #Now extract skills correctly
-        job_skills = extract_skills_from_text(job_description)
-        resume_skills = extract_skills_from_text(resume_text)
-
-        if job_skills:
-            match_score = (len(job_skills & resume_skills) / len(job_skills)) * 100
-        else:
-            match_score = 0
+        job_skills = job_skill_sets[job_id]
+        resume_skills = resume_skill_sets[row["applicant_id"]]
         
         missing_skills = job_skills - resume_skills
         
-        if match_score >= 50:
+        if match_score >= SCREENING_PASS_SCORE:
             status = 'Success'
             feedback = f"Congratulations! Your application matched with a score of {match_score:.2f}%."
         else:
             status = 'Rejected'
             feedback = f"Unfortunately, \n your application did not meet our requirements due to missing key skills: {', '.join(missing_skills)}."
         
-        pdf_path = generate_pdf(name, email, job_id, match_score, missing_skills, feedback)
-        send_email_with_pdf(name, email, pdf_path)
-        
-        cursor.execute("UPDATE applications SET status=?, feedback=?, match_score=? WHERE name=?", 
-                       (status, feedback, match_score, name))
+        reports.append((int(row["applicant_id"]), name, email, job_titles[job_id], match_score, missing_skills, feedback))
+        results.append((row, status, feedback, match_score))
+
+    # Render the batch's reports in parallel, then queue the emails and save the results
+    pdf_paths = render_reports(reports, max_workers=report_workers)
+    # Each result and its email are committed together, one transaction per RESULT_BATCH_SIZE rows
+    with ResultWriter() as writer:
+        for (row, status, feedback, match_score), pdf_path in zip(results, pdf_paths):
+            if row.get("status") != status:
+                send_email_with_pdf(row["name"], row["email"], pdf_path, applicant_id=row["applicant_id"], commit=False)
+            # Successes are categorized by trigger; a rescreened rejection drops its old category
+            category = None if status == 'Success' else 'Uncategorized'
+            writer.add(row["applicant_id"], status=status, feedback=feedback, match_score=match_score, category=category, pdf_report=pdf_path)
+    return len(results)
+
+def count_unindexed_applications():
+    """Counts applications whose skills are not yet in the inverted index."""
+    cursor = get_connection().cursor()
+    return cursor.execute(
+        """
+        SELECT (SELECT COUNT(*) FROM applications WHERE applicant_id NOT IN (SELECT applicant_id FROM application_skills))
+             + (SELECT COUNT(*) FROM application_skills
+                WHERE skills != '[]' AND applicant_id NOT IN (SELECT applicant_id FROM application_skill_index))
+        """
+    ).fetchone()[0]
+
+def index_unindexed_applications(batch_size=SCREENING_BATCH_SIZE):
+    """Adds applications that predate the inverted index to it, in batches.
+
+    Stored skill sets are copied straight from application_skills; only
+    applications without stored skills are parsed with spaCy.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        INSERT OR IGNORE INTO application_skill_index (skill, applicant_id)
+        SELECT skill.value, s.applicant_id FROM application_skills s, json_each(s.skills) AS skill
+        WHERE s.applicant_id NOT IN (SELECT applicant_id FROM application_skill_index)
+        """
+    )
+    conn.commit()
+    while True:
+        missing = [applicant_id for (applicant_id,) in cursor.execute(
+            "SELECT applicant_id FROM applications WHERE applicant_id NOT IN (SELECT applicant_id FROM application_skills) LIMIT ?",
+            (batch_size,),
+        ).fetchall()]
+        if not missing:
+            break
+        load_application_skills(missing)
+
+def recommend_candidates(job_id, top_k=10):
+    """Returns the top-k applications (to any job) whose stored skills best cover a job's skills."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT description FROM jobs WHERE job_id = ?", (int(job_id),))
+    job_data = cursor.fetchone()
+    if not job_data:
+        return pd.DataFrame(columns=["applicant_id", "name", "email", "applied_for", "matched_skills", "match_score", "similarity"])
+    job_skills = get_job_skills(job_id, job_data[0])
+    if job_skills and not cursor.execute("SELECT 1 FROM job_skill_index WHERE job_id = ? LIMIT 1", (int(job_id),)).fetchone():
+        index_job_skills(job_id, job_skills)
         conn.commit()
+    candidates = pd.read_sql(
+        """
+        SELECT a.applicant_id, a.name, a.email, j.title AS applied_for, COUNT(*) AS matched_skills
+        FROM job_skill_index js
+        JOIN application_skill_index s ON s.skill = js.skill
+        JOIN applications a ON a.applicant_id = s.applicant_id
+        LEFT JOIN jobs j ON j.job_id = a.job_id
+        WHERE js.job_id = ?
+        GROUP BY a.applicant_id
+        ORDER BY matched_skills DESC, a.applicant_id
+        LIMIT ?
+        """,
+        conn,
+        params=(int(job_id), int(top_k)),
+    )
+    # Score the shortlist against the job in one call: coverage is the match score, and cosine
+    # similarity also penalizes resumes that list many skills the job does not need
+    if candidates.empty:
+        candidates["match_score"] = candidates["similarity"] = pd.Series(dtype="float64")
+        return candidates
+    resume_skill_sets = load_application_skills(candidates["applicant_id"])
+    coverage, similarity = pairwise_scores([resume_skill_sets[int(applicant_id)] for applicant_id in candidates["applicant_id"]],
+                                           [job_skills])
+    candidates["match_score"] = coverage.toarray().ravel()
+    candidates["similarity"] = similarity.toarray().ravel()
+    return candidates
+
+def requeue_manual_review(job_id):
+    """Sends a job's Manual Review applications back to the screening queue once its description has skills.
+
+    Returns the number of applications requeued; the worker screens them with its next batch.
+    """
+    conn = get_connection()
+    job_data = conn.execute("SELECT description FROM jobs WHERE job_id = ?", (int(job_id),)).fetchone()
+    if not job_data or not get_job_skills(job_id, job_data[0]):
+        return 0
+    with conn:
+        cursor = conn.execute(
+            "UPDATE applications SET status = 'Under Review', feedback = '', lease_owner = NULL, lease_expires = NULL "
+            "WHERE job_id = ? AND status = ?",
+            (int(job_id), MANUAL_REVIEW_STATUS),
+        )
+    return cursor.rowcount
+
+def rescore_job(job_id):
+    """Rescreens every screened application to a job against its current description.
+
+    Score, status, feedback and report are recomputed together by screen_batch;
+    applications Under Review or Approved are left alone, and Manual Review ones
+    are requeued if the description now has skills. Returns the number of
+    applications rescored or requeued.
+    """
+    conn = get_connection()
+    if not conn.execute("SELECT 1 FROM jobs WHERE job_id = ?", (int(job_id),)).fetchone():
+        return 0
+    requeued = requeue_manual_review(job_id)
+    applications = pd.read_sql(JOB_APPLICANTS_SQL, conn, params=(int(job_id),))
+    rescored = screen_batch(applications)
+    deliver_outbox()
+    return rescored + requeued
+
+def backfill_skills(batch_size=SCREENING_BATCH_SIZE):
+    """Extracts and indexes the skills of every job and application that lacks them, in batches."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    jobs = load_jobs(job_id for (job_id,) in cursor.execute("SELECT job_id FROM jobs").fetchall())
+    for job_id, skills in load_job_skills(zip(jobs["job_id"], jobs["description"])).items():
+        index_job_skills(job_id, skills)
+    conn.commit()
+    print(f"Indexed skills for {len(jobs)} jobs.")
+    remaining = count_unindexed_applications()
+    index_unindexed_applications(batch_size=batch_size)
+    print(f"Indexed skills for {remaining} applications.")
+
+def backfill_match_scores(batch_size=SCREENING_BATCH_SIZE):
+    """Rescreens every Success and Rejected application from its stored skills, in batches.
+
+    Score, status, feedback and report are recomputed together by screen_batch;
+    applicants whose status changes get a new report through the outbox.
+    Applications Under Review or Approved, and those whose job is gone, are left
+    alone. Batches are walked by applicant_id and committed one at a time, so a
+    long run on a large database can be stopped and restarted.
+    """
+    conn = get_connection()
+    last_id = 0
+    rescored = 0
+    while True:
+        batch = pd.read_sql(
+            f"""
+            SELECT applicant_id, name, email, job_id, status FROM applications
+            WHERE status IN {SCREENED_STATUSES} AND applicant_id > ? ORDER BY applicant_id LIMIT ?
+            """,
+            conn,
+            params=(last_id, batch_size),
+        )
+        if batch.empty:
+            break
+        last_id = int(batch["applicant_id"].iloc[-1])
+        batch = batch[batch["job_id"].isin(load_jobs(batch["job_id"])["job_id"])]
+        rescored += screen_batch(batch, batch_size=batch_size, report_workers=REPORT_WORKERS)
+        print(f"Rescored {rescored} applications (through applicant {last_id}).")
+    return rescored
+
+def claim_applications(worker_id, limit=SCREENING_BATCH_SIZE, lease_seconds=SCREENING_LEASE_SECONDS):
+    """Leases up to `limit` applications that are Under Review to one worker.
+
+    Rows whose lease has expired (e.g. a crashed worker) can be claimed again.
+    The claim is a single UPDATE, so concurrent workers never share a row.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    now = time.time()
+    cursor.execute(
+        """
+        UPDATE applications SET lease_owner = ?, lease_expires = ?
+        WHERE applicant_id IN (
+            SELECT applicant_id FROM applications
+            WHERE status = 'Under Review' AND (lease_expires IS NULL OR lease_expires < ?)
+            ORDER BY applicant_id LIMIT ?
+        )
+        """,
+        (worker_id, now + lease_seconds, now, limit),
+    )
+    conn.commit()
+    return pd.read_sql(
+        "SELECT applicant_id, name, email, job_id FROM applications WHERE status = 'Under Review' AND lease_owner = ?",
+        conn,
+        params=(worker_id,),
+    )
+
+def run_screening_worker(batch_size=SCREENING_BATCH_SIZE, poll_interval=SCREENING_POLL_INTERVAL, once=False):
+    """Claims and screens applications in batches until stopped (or drained, with once=True).
+
+    The outbox is drained after every batch, which also retries earlier failed sends.
+    When idle, superseded report files are swept every REPORT_SWEEP_INTERVAL seconds.
+    Exits without mail credentials, or if another process switches the skill extractor recorded in settings.
+    """
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    extractor = skill_extractor_key()
+    problem = mail_settings_problem()
+    if problem:
+        raise SystemExit(problem)
+    print(f"Screening worker {worker_id} started (batch size {batch_size}, skill extractor {extractor}).")
+    index_unindexed_applications(batch_size=batch_size)
+    last_sweep = 0
+    while True:
+        # Another process may have switched extractors and cleared the stored skills; this
+        # worker's cached job skills and its own extractor would then disagree with them
+        recorded = get_connection().execute(RECORDED_SKILL_EXTRACTOR_SQL).fetchone()
+        if recorded and recorded[0] != extractor:
+            raise SystemExit(f"Skill extractor changed to {recorded[0]} while this worker uses {extractor}; "
+                             "restart it with the matching ATS_SKILL_EXTRACTOR and ATS_SKILL_LEXICON.")
+        batch = claim_applications(worker_id, limit=batch_size)
+        if not batch.empty:
+            screened = screen_batch(batch, report_workers=REPORT_WORKERS)
+            print(f"Screened {screened} applications.")
+            if screened < len(batch):
+                print(f"Moved {len(batch) - screened} applications to {MANUAL_REVIEW_STATUS}.")
+        deliver_outbox()
+        if batch.empty:
+            if time.time() - last_sweep >= REPORT_SWEEP_INTERVAL:
+                swept = sweep_reports()
+                last_sweep = time.time()
+                if swept:
+                    print(f"Deleted {swept} superseded feedback reports.")
+            if once:
+                break
+            time.sleep(poll_interval)
+
+def screening_progress():
+    """Returns application counts for the screening progress panel.
+
+    Per-status counts come from dashboard_counters; only the leased rows are
+    counted in applications, through the status index.
+    """
+    cursor = get_connection().cursor()
+    counts = dict(cursor.execute(DASHBOARD_COUNTS_SQL, ("status",)).fetchall())
+    in_progress = cursor.execute(ACTIVE_LEASES_SQL, (time.time(),)).fetchone()[0]
+    if in_progress:
+        counts["Under Review"] = counts.get("Under Review", 0) - in_progress
+        counts["Screening"] = in_progress
+    return counts
+
+def show_screening_progress():
+    counts = screening_progress()
+    queued = counts.get("Under Review", 0)
+    in_progress = counts.get("Screening", 0)
+    total = sum(counts.values())
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Queued", queued)
+    col2.metric("Screening", in_progress)
+    col3.metric("Success", counts.get("Success", 0))
+    col4.metric("Rejected", counts.get("Rejected", 0))
+    if total:
+        st.progress((total - queued - in_progress) / total, text=f"{total - queued - in_progress} of {total} applications screened")
+    if queued or in_progress:
+        st.caption("Applications are screened by the background worker (`python -m ats worker`).")
+
 # Register function for both roles
 def register_user(role):
+    conn = get_connection()
+    cursor = conn.cursor()
     username = st.text_input("Username")
     password = st.text_input("Password", type="password")
     if st.button("Register"):
@@ -361,6 +2251,7 @@ def register_user(role):
         
 # Login function with redirection to the appropriate dashboard
 def login(role):
+    cursor = get_connection().cursor()
     username = st.text_input("Username")
     password = st.text_input("Password", type="password")
     if st.button("Login"):
@@ -383,32 +2274,25 @@ def login(role):
 
 def send_otp(email):
     """Generate and send OTP to user email for password reset."""
+    conn = get_connection()
+    cursor = conn.cursor()
     otp = str(random.randint(100000, 999999))
     cursor.execute("UPDATE users SET otp=? WHERE email=?", (otp, email))
     conn.commit()
     
-    sender_email = "nguaemmanuel190@gmail.com"
-    sender_password = "vyok ebpu lctf xupr"
     subject = "Password Reset OTP"
     body = f"Your OTP for password reset is: {otp}. It is valid for 10 minutes."
+    message_id = enqueue_email(email, subject, body, template="password_reset_otp")
     
-    msg = MIMEMultipart()
-    msg['From'] = sender_email
-    msg['To'] = email
-    msg['Subject'] = subject
-    msg.attach(MIMEText(body, 'plain'))
-    
-    try:
-        with smtplib.SMTP("smtp.gmail.com", 587) as server:
-            server.starttls()
-            server.login(sender_email, sender_password)
-            server.sendmail(sender_email, email, msg.as_string())
+    if deliver_outbox([message_id]).get(message_id) == "sent":
         st.success("OTP sent successfully to your email.")
-    except Exception as e:
-        st.error(f"Failed to send OTP: {e}")
+    else:
+        st.error("Failed to send OTP. Please try again in a few minutes.")
 
 def reset_password():
     """Reset user password using OTP verification."""
+    conn = get_connection()
+    cursor = conn.cursor()
     st.subheader("Forgot Password?")
     email = st.text_input("Enter your registered email")
     
@@ -439,11 +2323,8 @@ def reset_password():
                 st.error("Invalid OTP. Please try again.")
     
 def send_bulk_feedbackk(applicants, status):
-    sender_email = "nguaemmanuel190@gmail.com"
-    sender_password = "vyok ebpu lctf xupr"  # Use App Password if needed
+    conn = get_connection()
     subject = f"Application Update - {status}"
-
-    success_count = 0  # Track successful emails
     
     if applicants.empty:
         st.warning("⚠️ No applicants to send emails to.")
@@ -451,48 +2332,225 @@ def send_bulk_feedbackk(applicants, status):
 
     st.write("📧 Sending emails to", len(applicants), "applicants...")
     
+    message_ids = []
     for _, row in applicants.iterrows():
-        recipient_email = row['email']
-        name = row['name']
-        message = f"Dear {name}, Your application has been categorized as '{status}'."
+        message = f"Dear {row['name']}, Your application has been categorized as '{status}'."
+        message_ids.append(enqueue_email(row['email'], subject, message, applicant_id=row.get('applicant_id'),
+                                         template="stage_update", commit=False))
+    conn.commit()
+    # Delivered in the background over a bounded number of pooled connections
+    return start_mail_dispatch(message_ids)
 
-        msg = MIMEMultipart()
-        msg['From'] = sender_email
-        msg['To'] = recipient_email
-        msg['Subject'] = subject
-        msg.attach(MIMEText(message, 'plain'))
+@st.cache_data(ttl=DASHBOARD_CACHE_TTL)
+def load_dashboard_counts(dimension):
+    """Returns application counts per status or gender from the trigger-maintained dashboard_counters."""
+    counts = pd.read_sql(DASHBOARD_COUNTS_SQL, get_connection(), params=(dimension,))
+    return counts.rename(columns={"value": dimension})
 
-        try:
-            with smtplib.SMTP("smtp.gmail.com", 587) as server:
-                server.starttls()
-                server.login(sender_email, sender_password)
-                server.sendmail(sender_email, recipient_email, msg.as_string())
-                success_count += 1  # Increment count on successful email
-            st.success(f"✅ Email successfully sent to {recipient_email}")
-        except smtplib.SMTPAuthenticationError:
-            st.error("🔒 SMTP Authentication Error: Please check your email credentials or use an App Password.")
-            return 0
-        except smtplib.SMTPRecipientsRefused:
-            st.error(f"🚫 Invalid recipient address: {recipient_email}. Please verify the email format.")
-        except smtplib.SMTPConnectError:
-            st.error("🌐 Connection Error: Unable to reach the mail server. Check your internet connection.")
-            return 0
-        except smtplib.SMTPException as e:
-            st.error(f"⚠️ SMTP Error: {e}")
-            return 0
-        except Exception as e:
-            st.error(f"❌ Unexpected Error: {e}")
-            return 0
-    return success_count  # Always return an integer
+def fetch_applications_page(status=None, after_id=0, limit=ADMIN_PAGE_SIZE):
+    """Returns up to `limit` applications after applicant_id `after_id`, without resume text.
+
+    Keyset pagination: each page is one index range scan, so a page costs the
+    same however many applications come before it.
+    """
+    if status is None:
+        return pd.read_sql(ALL_APPLICATIONS_PAGE_SQL, get_connection(), params=(int(after_id), int(limit)))
+    return pd.read_sql(APPLICATIONS_PAGE_SQL, get_connection(), params=(status, int(after_id), int(limit)))
+
+def fetch_jobs_page(title_filter="", after_id=0, limit=ADMIN_PAGE_SIZE):
+    """Returns up to `limit` jobs after job_id `after_id` whose title contains `title_filter`."""
+    pattern = f"%{title_filter}%"
+    return cached_query("jobs page", JOBS_PAGE_SQL, (pattern, int(after_id), int(limit)), scopes=[JOBS_SCOPE])
+
+# cache_versions scopes: every job, and the applications of one user
+JOBS_SCOPE = ("jobs", 0)
+
+def user_applications_scope(user_id):
+    return ("applications", int(user_id))
+
+class QueryCache:
+    """Process-wide cache of read-mostly query results with hit/miss counters.
+
+    Each result is stored with the cache_versions of the scopes it reads. Triggers
+    bump those versions whenever the underlying rows change, in this process or
+    another, so a result is served from memory until then at the cost of one
+    primary-key lookup per scope. Cached DataFrames are shared: treat them as read-only.
+    """
+
+    def __init__(self, maxsize=QUERY_CACHE_SIZE):
+        self.entries = LRUCache(maxsize)
+        self.lock = threading.Lock()
+        self.counts = {}
+
+    def get(self, name, sql, params=(), scopes=()):
+        conn = get_connection()
+        # Versions are read before the query, so a write racing the load only costs a reload
+        versions = tuple(self.version(conn, scope) for scope in scopes)
+        key = (sql, tuple(params))
+        with self.lock:
+            entry = self.entries.get(key)
+            hit = entry is not None and entry[0] == versions
+            counts = self.counts.setdefault(name, [0, 0])
+            counts[0 if hit else 1] += 1
+        if hit:
+            return entry[1]
+        result = pd.read_sql(sql, conn, params=tuple(params))
+        with self.lock:
+            self.entries.put(key, (versions, result))
+        return result
+
+    def version(self, conn, scope):
+        row = conn.execute("SELECT version FROM cache_versions WHERE scope = ? AND key = ?", scope).fetchone()
+        return row[0] if row else 0
+
+    def stats(self):
+        """Returns hits, misses and hit rate per cached query."""
+        with self.lock:
+            rows = [(name, hits, misses) for name, (hits, misses) in sorted(self.counts.items())]
+        stats = pd.DataFrame(rows, columns=["query", "hits", "misses"])
+        stats["hit_rate"] = stats["hits"] / (stats["hits"] + stats["misses"]).where(lambda total: total > 0)
+        return stats
+
+@st.cache_resource
+def query_cache():
+    """Process-wide QueryCache, kept across Streamlit reruns and sessions."""
+    return QueryCache()
+
+def cached_query(name, sql, params=(), scopes=()):
+    """Runs a read-only query through query_cache(), reusing its last result while `scopes` are unchanged."""
+    return query_cache().get(name, sql, params, scopes)
+
+def load_job_titles():
+    """Returns the job_id and title of every job."""
+    return cached_query("job titles", JOB_TITLES_SQL, scopes=[JOBS_SCOPE])
+
+# Applicant report columns, in export order
+REPORT_EXPORT_SQL = """
+    SELECT a.name, a.email, a.gender, a.job_id, a.status, a.feedback, a.submitted_on, r.resume, a.match_score
+    FROM applications a
+    LEFT JOIN application_resumes ar ON ar.applicant_id = a.applicant_id
+    LEFT JOIN resumes r ON r.resume_hash = ar.resume_hash
+    ORDER BY a.applicant_id
+"""
+# Fixed column types, so a chunk whose job_ids are NULL still writes 21 rather than 21.0
+REPORT_EXPORT_DTYPES = {"job_id": "Int64", "match_score": "float64"}
+EXPORT_FORMATS = {"csv": "text/csv", "csv.gz": "application/gzip", "parquet": "application/vnd.apache.parquet"}
+
+def export_report(out, export_format="csv", chunk_size=EXPORT_CHUNK_SIZE):
+    """Streams the applicant report into a binary file object and returns the number of rows written.
+
+    Rows are read and written `chunk_size` at a time, so memory use does not
+    grow with the number of applications.
+    """
+    chunks = pd.read_sql(REPORT_EXPORT_SQL, get_connection(), chunksize=chunk_size, dtype=REPORT_EXPORT_DTYPES)
+    if export_format == "parquet":
+        return _write_parquet(chunks, out)
+    if export_format == "csv.gz":
+        with gzip.GzipFile(fileobj=out, mode="wb") as compressed:
+            return _write_csv(chunks, compressed)
+    if export_format == "csv":
+        return _write_csv(chunks, out)
+    raise ValueError(f"Unknown export format: {export_format}")
+
+def _write_csv(chunks, out):
+    text = io.TextIOWrapper(out, encoding="utf-8", newline="")
+    rows = 0
+    for chunk in chunks:
+        chunk.to_csv(text, header=rows == 0, index=False)
+        rows += len(chunk)
+    text.flush()
+    text.detach()  # leave `out` open for the caller
+    return rows
+
+def _write_parquet(chunks, out):
+    # pyarrow is only needed for Parquet exports, so it is imported here rather than at startup
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = pa.schema([
+        ("name", pa.string()), ("email", pa.string()), ("gender", pa.string()), ("job_id", pa.int64()),
+        ("status", pa.string()), ("feedback", pa.string()), ("submitted_on", pa.string()),
+        ("resume", pa.string()), ("match_score", pa.float64()),
+    ])
+    rows = 0
+    with pq.ParquetWriter(out, schema, compression="zstd") as writer:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))  # one row group per chunk
+            rows += len(chunk)
+    return rows
+
+def export_report_file(export_format="csv", path=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Exports the applicant report to a file (by default a timestamped one in EXPORT_DIR) and returns its path and row count."""
+    if path is None:
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        path = os.path.join(EXPORT_DIR, f"report-{datetime.now():%Y%m%d-%H%M%S}.{export_format}")
+    with open(path, "wb") as out:
+        rows = export_report(out, export_format, chunk_size=chunk_size)
+    return path, rows
+
+def load_resume(applicant_id):
+    """Returns one applicant's resume text."""
+    row = get_connection().execute(
+        "SELECT r.resume FROM application_resumes ar JOIN resumes r ON r.resume_hash = ar.resume_hash WHERE ar.applicant_id = ?",
+        (int(applicant_id),),
+    ).fetchone()
+    return row[0] if row else ""
+
+def show_keyset_page(key, fetch_page, page_size=ADMIN_PAGE_SIZE, total=None):
+    """Renders Previous/Next controls for a keyset-paginated table and returns the page to show.
+
+    `fetch_page(after_id, limit)` must return rows in id order with the id in
+    the first column. The last id of each earlier page is kept in session
+    state, so only the page on screen is ever loaded.
+    """
+    cursors = st.session_state.setdefault(key, [0])
+    page = fetch_page(cursors[-1], page_size + 1)
+    has_next = len(page) > page_size
+    page = page.iloc[:page_size]
+    col_prev, col_info, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if st.button("⬅️ Previous", key=f"{key}_prev", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+    with col_info:
+        st.caption(f"Page {len(cursors)}" + (f" of {max(1, -(-total // page_size))} ({total} rows)" if total is not None else ""))
+    with col_next:
+        if st.button("Next ➡️", key=f"{key}_next", disabled=not has_next):
+            cursors.append(int(page.iloc[-1, 0]))
+            st.rerun()
+    return page
+
+def show_resume_viewer(page, key):
+    """Lets the admin open the resume of one applicant on the current page."""
+    if page.empty:
+        return
+    names = dict(zip(page["applicant_id"], page["name"]))
+    applicant_id = st.selectbox("View resume", list(names), index=None, format_func=lambda applicant_id: f"{applicant_id} - {names[applicant_id]}",
+                                key=f"{key}_resume", placeholder="Choose an applicant")
+    if applicant_id is not None:
+        st.text_area("Resume", load_resume(applicant_id), height=300, disabled=True, key=f"{key}_resume_{applicant_id}")
+
+def show_applications_page(key, status=None):
+    """Shows one page of applications with a resume viewer."""
+    counts = load_dashboard_counts("status")
+    total = int(counts["count"].sum() if status is None else counts.loc[counts["status"] == status, "count"].sum())
+    page = show_keyset_page(key, lambda after_id, limit: fetch_applications_page(status, after_id, limit), total=total)
+    st.dataframe(page, hide_index=True)
+    show_resume_viewer(page, key)
 
 # Admin dashboard: job management, application screening, feedback
 def admin_dashboard():
+    conn = get_connection()
+    cursor = conn.cursor()
     st.sidebar.title("Admin Dashboard")
     st.sidebar.title(f"Welcome, {st.session_state['username']} !!!")
-    action = st.sidebar.radio("Options", ["Dashboard","Post Job", "Manage Jobs", "View Applications","Categorized Applications","Generate Reports"])
+    action = st.sidebar.radio("Options", ["Dashboard","Post Job", "Manage Jobs", "View Applications","Categorized Applications","Recommended Candidates","Generate Reports"])
+    show_mail_dispatch()
 
     if action == "Dashboard":
         st.title("Data Visualizations")
+        plt, sns = load_plotting()
+        with st.expander("Query Cache"):
+            st.dataframe(query_cache().stats())
 
         # Set up columns for side-by-side visualization
         col1, col2 = st.columns(2)
@@ -500,7 +2558,7 @@ def admin_dashboard():
         # Visualization 1: Total Applications by Status (Pie Chart)
         with col1:
             st.markdown("<div class='card'><div class='card-title'>Total Applications by Status</div>", unsafe_allow_html=True)
-            app_status = pd.read_sql("SELECT status, COUNT(*) as count FROM applications GROUP BY status", conn)
+            app_status = load_dashboard_counts("status")
             fig1, ax1 = plt.subplots()
             ax1.pie(app_status['count'], labels=app_status['status'], autopct='%1.0f%%', startangle=140)  # Removed decimals
             ax1.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
@@ -510,7 +2568,7 @@ def admin_dashboard():
         # Visualization 2: Gender Distribution of Applicants (Bar Chart)
         with col2:
             st.markdown("<div class='card'><div class='card-title'>Gender Distribution of Applicants</div>", unsafe_allow_html=True)
-            gender_data = pd.read_sql("SELECT gender, COUNT(*) as count FROM applications GROUP BY gender", conn)
+            gender_data = load_dashboard_counts("gender")
             fig2, ax2 = plt.subplots()
             sns.barplot(x='gender', y='count', data=gender_data, ax=ax2)
             ax2.set_xlabel("Gender")
@@ -567,8 +2625,12 @@ def admin_dashboard():
                 (title, description, posted_on, deadline),
             )
             conn.commit()
+            # Parse the description once now so screening reads it from the job skill cache
+            job_skills = get_job_skills(cursor.lastrowid, description)
 
             st.success("🎉 Job posted successfully!")
+            if not job_skills:
+                st.warning(NO_JOB_SKILLS_WARNING)
 
             # Use `st.session_state.clear()` to reset form fields
             for key in ["job_title", "job_description", "job_deadline"]:
@@ -578,16 +2640,15 @@ def admin_dashboard():
 
     elif action == "Manage Jobs":
         # Fetch the total number of jobs available
-        jobs_df = pd.read_sql("SELECT job_id, title, description, posted_on, deadline FROM jobs", conn)
-        total_jobs = len(jobs_df)
+        total_jobs = cached_query("job count", JOB_COUNT_SQL, scopes=[JOBS_SCOPE])["jobs"].iloc[0]
         st.subheader(f"Current Job Openings ({total_jobs})")
 
         # Text input for search query
         search_query = st.text_input("🔍 Search Job by Title", "", key="search_job_title")
 
-        # Dynamically filter jobs if search_query is not empty
-        if search_query:
-            jobs_df = jobs_df[jobs_df["title"].str.contains(search_query, case=False, na=False)]
+        # Only one page of jobs, filtered in SQL, is loaded at a time
+        jobs_df = show_keyset_page(f"job_pages_{search_query}",
+                                   lambda after_id, limit: fetch_jobs_page(search_query, after_id, limit))
         
         if jobs_df.empty:
             st.warning("No job postings available.")
@@ -597,7 +2658,7 @@ def admin_dashboard():
                     st.write(f"**Posted On:** {row['posted_on']}")
                     st.write(f"**Description:** {row['description']}")
 
-                    col1, col2 = st.columns([1, 1])
+                    col1, col2, col3 = st.columns([1, 1, 1])
 
                     # Edit Button
                     with col1:
@@ -614,11 +2675,18 @@ def admin_dashboard():
                         if st.button("🗑️ Delete", key=f"delete_{row['job_id']}"):
                             cursor.execute("DELETE FROM jobs WHERE job_id=?", (row["job_id"],))
                             conn.commit()
+                            forget_job_skills(row["job_id"])
                             st.success("Job deleted successfully!")
                             st.warning(f"Deleted job: {row['title']}")
                             time.sleep(2)
                             st.rerun()
 
+                    # Rescore Button
+                    with col3:
+                        if st.button("🔄 Rescore", key=f"rescore_{row['job_id']}"):
+                            rescored = rescore_job(row["job_id"])
+                            st.success(f"Rescored {rescored} applications.")
+
         # If an edit button is clicked, show the editing form
         if st.session_state.get("editing", False):
             st.subheader("Edit Job Posting")
@@ -631,7 +2699,14 @@ def admin_dashboard():
                 cursor.execute("UPDATE jobs SET title=?, description=?, deadline=? WHERE job_id=?", 
                             (new_title, new_description, new_deadline, st.session_state["edit_job_id"]))
                 conn.commit()
+                job_skills = get_job_skills(st.session_state["edit_job_id"], new_description)
                 st.success("Job updated successfully!")
+                if not job_skills:
+                    st.warning(NO_JOB_SKILLS_WARNING)
+                else:
+                    requeued = requeue_manual_review(st.session_state["edit_job_id"])
+                    if requeued:
+                        st.info(f"{requeued} {MANUAL_REVIEW_STATUS} applications were queued for screening again.")
                 st.session_state["editing"] = False
                 time.sleep(2)
                 st.rerun()
@@ -639,16 +2714,18 @@ def admin_dashboard():
 
     elif action == "View Applications":
         st.subheader("Applications Overview")
-        screen_applications()
+        show_screening_progress()
         st.subheader("Bias Detection Analysis")
     
-        if st.button("Run Bias Detection"):
+        # A toggle rather than a button, so picking a job keeps the analysis open
+        if st.toggle("Run Bias Detection", key="show_bias"):
             detect_bias()
         with st.expander("Success"):
-            success_apps = pd.read_sql("SELECT name, email, gender, job_id, status, feedback, resume, match_score FROM applications WHERE status='Success'", conn)
-            st.write(success_apps)  
+            show_applications_page("success_pages", "Success")
             
             if st.button("📩 Send to Stage 2"):
+                # Bulk actions load every matching row, still without resume text
+                success_apps = pd.read_sql(APPLICATIONS_BY_STATUS_SQL, conn, params=("Success",))
                 if not success_apps.empty:
                     sent_emails = send_bulk_feedbackk(success_apps, "Success") or 0  
                     categorize_applications()
@@ -656,43 +2733,33 @@ def admin_dashboard():
                     if sent_emails > 0:  #Prevent NoneType error
                         st.success(f"🎉{sent_emails} Applications successfully sent to Stage 2 for further screening.")
                     else:
-                        st.warning("⚠️Emails were not sent. Check SMTP settings.")
+                        st.warning("⚠️Emails were not queued. Please try again.")
                     time.sleep(2)
                     st.rerun()
                 else:
                     st.warning("⚠️No applications to send.")
 
         with st.expander("Rejected"):
-            rejected_apps = pd.read_sql("SELECT name, email, gender, job_id, status, feedback, resume, match_score FROM applications WHERE status='Rejected'", conn)
-            st.write(rejected_apps)
+            show_applications_page("rejected_pages", "Rejected")
             if st.button("📩 Send Rejection Emails"):
-                send_bulk_feedback(rejected_apps, "Rejected")
-                for _, row in rejected_apps.iterrows():
-                    name = row["name"]
-                    email = row["email"]
-                    job_id = row["job_id"]
-                    match_score = row["match_score"]
-                    feedback = row["feedback"]
-                    
-                    # Fetch job description from the database using job_id
-                    cursor.execute("SELECT description FROM jobs WHERE job_id = ?", (job_id,))
-                    job_data = cursor.fetchone()
-                    job_description = job_data[0] if job_data else ""
-                    
-                    # Extract skills from resume and job description
-                    resume_skills = extract_skills_from_text(row["resume"])
-                    job_skills = extract_skills_from_text(job_description)  # Use job_description here
-                    
-                    missing_skills = job_skills - resume_skills
-
-                    pdf_path = generate_pdf(name, email, job_id, match_score, missing_skills, feedback)
-                    send_email_with_pdf(name, email, pdf_path)
-                    
-                    time.sleep(2)
+                rejected_apps = pd.read_sql(APPLICATIONS_BY_STATUS_SQL, conn, params=("Rejected",))
+                message_ids = send_bulk_feedback(rejected_apps, "Rejected")
+                # Missing skills come from the stored skill sets; all reports render in one batch
+                pdf_paths = render_reports(build_feedback_reports(rejected_apps))
+                record_report_paths(rejected_apps["applicant_id"], pdf_paths)
+                for (_, row), pdf_path in zip(rejected_apps.iterrows(), pdf_paths):
+                    message_ids.append(send_email_with_pdf(row["name"], row["email"], pdf_path, applicant_id=row["applicant_id"]))
+
+                if message_ids:
+                    start_mail_dispatch(message_ids)
                     st.rerun()
                 else:
                     st.warning("⚠️No applications to send.")
 
+        with st.expander(MANUAL_REVIEW_STATUS):
+            st.caption("Applications the screening worker could not score; review them by hand.")
+            show_applications_page("manual_review_pages", MANUAL_REVIEW_STATUS)
+
         with st.expander("📩 Invite Candidates for Reassessment"):
 
                 # Dynamic Filtering
@@ -701,7 +2768,7 @@ def admin_dashboard():
 
                 # Fetch candidates from the database based on the score range
                 invite_candidates = pd.read_sql(
-                    "SELECT name, email, gender, job_id, status, feedback, resume, match_score FROM applications WHERE status='Rejected' AND match_score BETWEEN ? AND ?",
+                    REASSESSMENT_CANDIDATES_SQL,
                     conn,
                     params=(lower_threshold, upper_threshold),
                 )
@@ -723,27 +2790,16 @@ def admin_dashboard():
 
                         # Bulk Send Invitations
                         if st.button("📩 Send Invitations"):
-                            for row in selected_candidates:
-                                name, email, job_id, match_score, feedback, resume = row["name"], row["email"], row["job_id"], row["match_score"], row["feedback"], row["resume"]
-
-                                # Fetch job description from the database
-                                cursor.execute("SELECT description FROM jobs WHERE job_id = ?", (job_id,))
-                                job_data = cursor.fetchone()
-                                job_description = job_data[0] if job_data else ""
-
-                                # Extract skills from resume and job description
-                                resume_skills = extract_skills_from_text(resume)
-                                job_skills = extract_skills_from_text(job_description)
-                                missing_skills = job_skills - resume_skills
-
-                                # Generate PDF with missing skills and feedback
-                                pdf_path = generate_pdf(name, "Job Title", match_score, resume_skills, missing_skills, feedback)
-
-                                # Send an invitation email with PDF
-                                send_invitation_email(name, email, pdf_path)
-                                time.sleep(2)  # Prevents overloading SMTP server
-
-                            st.success("✅ Invitations sent successfully!")
+                            # Generate PDFs with missing skills and feedback in one batch
+                            pdf_paths = render_reports(build_feedback_reports(pd.DataFrame(selected_candidates)))
+                            record_report_paths([row["applicant_id"] for row in selected_candidates], pdf_paths)
+                            message_ids = []
+                            for row, pdf_path in zip(selected_candidates, pdf_paths):
+                                # Queue an invitation email with PDF; the sender rate-limits delivery
+                                message_ids.append(send_invitation_email(row["name"], row["email"], pdf_path, row["match_score"], applicant_id=row["applicant_id"]))
+
+                            start_mail_dispatch(message_ids)
+                            st.rerun()
 
                     else:
                         st.warning("⚠️ No candidates selected. Please select candidates to send invitations.")
@@ -753,80 +2809,126 @@ def admin_dashboard():
 
     elif action == "Generate Reports":
         st.subheader("Applicant Reports")
-        report_df = pd.read_sql("SELECT name, email, gender, job_id, status, feedback, submitted_on, resume, match_score FROM applications", conn)
-        st.write(report_df)
-        st.download_button("Download Report as CSV", report_df.to_csv(index=False), "report.csv")
+        show_applications_page("report_pages")
+        # The full report, resumes included, is streamed to a file only when asked for
+        export_format = st.selectbox("Report format", list(EXPORT_FORMATS), key="report_format")
+        if st.button("Prepare Report"):
+            path, rows = export_report_file(export_format)
+            st.session_state["report_export"] = (path, export_format, rows)
+        if "report_export" in st.session_state:
+            path, export_format, rows = st.session_state["report_export"]
+            if os.path.exists(path):
+                with open(path, "rb") as report_file:
+                    st.download_button(f"Download Report ({rows} rows, {export_format})", report_file,
+                                       f"report.{export_format}", mime=EXPORT_FORMATS[export_format])
 
     if action == "Categorized Applications":
         view_categorized_applications()    
+    elif action == "Recommended Candidates":
+        view_recommended_candidates()
 
 
 
-SMTP_SERVER = "smtp.gmail.com"  # Change if using another provider
-SMTP_PORT = 587  # Standard TLS port
-SENDER_EMAIL = "nguaemmanuel190@gmail.com"
-SENDER_PASSWORD = "vyok ebpu lctf xupr"
-
-def send_invitation_email(name, email, pdf_path):
-    try:
-        # Create email message
-        msg = EmailMessage()
-        msg["Subject"] = "Invitation for Interview - Job Opportunity"
-        msg["From"] = SENDER_EMAIL
-        msg["To"] = email
-
-        # Email body (Updated for Interview Invitation)
-        msg.set_content(
-            f"""
-            Dear {name},
-
-            After reviewing your application, we are pleased to invite you for an **in-person interview** for the role.
-
-            📅 **Interview Date:** {interview_date}  
-            📍 **Location:** {interview_location}  
-
-            Please find attached a detailed report highlighting our evaluation of your skills.  
-
-            Kindly confirm your availability by replying to this email.
+def fairness_counts(by="gender", job_id=None):
+    """Returns true/false positive/negative counts per gender or job from fairness_counters."""
+    if by not in FAIRNESS_GROUPS:
+        raise ValueError(f"Cannot group fairness metrics by {by!r}; expected one of {FAIRNESS_GROUPS}.")
+    params = (None, None) if job_id is None else (int(job_id), int(job_id))
+    return pd.read_sql(FAIRNESS_COUNTS_SQL.format(group=by), get_connection(), params=params).set_index(by)
 
-            Best regards,  
-            Hiring Team
-            """
-        )
+def fairness_differences(by_group):
+    """Demographic parity and equalized odds differences: the largest gaps in a rate between groups."""
+    def gap(metric):
+        return float(by_group[metric].max() - by_group[metric].min()) if len(by_group) else 0.0
+    return {
+        "demographic_parity_difference": gap("selection_rate"),
+        "equalized_odds_difference": max(gap("true_positive_rate"), gap("false_positive_rate")),
+    }
 
-        # Send email
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()  # Secure connection
-            server.login(SENDER_EMAIL, SENDER_PASSWORD)
-            server.send_message(msg)
+def fairness_metrics(by="gender", job_id=None):
+    """Selection rate and true/false positive rates per group, and the differences between groups.
 
-        print(f"✅ Interview invitation sent to {email}")
-
-    except Exception as e:
-        print(f"❌ Error sending interview invitation to {email}: {e}")
+    Answered from the trigger-maintained fairness_counters, so the cost grows with
+    the number of groups rather than applications. fairness_metrics_full
+    recomputes the same figures from every application.
+    """
+    counts = fairness_counts(by, job_id)
+    total = counts.sum(axis=1)
+    def rate(numerator, denominator):
+        # Like fairlearn, a rate with no cases to count in a group is 0
+        return (numerator / denominator.where(denominator > 0)).fillna(0.0)
+    by_group = pd.DataFrame({
+        "count": total,
+        "selection_rate": rate(counts["tp"] + counts["fp"], total),
+        "true_positive_rate": rate(counts["tp"], counts["tp"] + counts["fn"]),
+        "false_positive_rate": rate(counts["fp"], counts["fp"] + counts["tn"]),
+    })
+    return {"by_group": by_group, **fairness_differences(by_group)}
+
+def fairness_metrics_full(by="gender", job_id=None):
+    """Recomputes fairness_metrics with fairlearn from every application, to cross-check the counters."""
+    if by not in FAIRNESS_GROUPS:
+        raise ValueError(f"Cannot group fairness metrics by {by!r}; expected one of {FAIRNESS_GROUPS}.")
+    query = "SELECT gender, job_id, match_score, status FROM applications"
+    params = ()
+    if job_id is not None:
+        query += " WHERE job_id = ?"
+        params = (int(job_id),)
+    df = pd.read_sql(query, get_connection(), params=params)
+    from fairlearn.metrics import (MetricFrame, count, selection_rate, true_positive_rate, false_positive_rate,
+                                   demographic_parity_difference, equalized_odds_difference)
+    if df.empty:
+        by_group = pd.DataFrame(columns=["count", "selection_rate", "true_positive_rate", "false_positive_rate"])
+        return {"by_group": by_group, **fairness_differences(by_group)}
+    # Same cells as fairness_counters: missing genders, jobs and scores count as 'Unknown', 0 and failing
+    y_true = df['status'] == 'Success'
+    y_pred = df['match_score'] >= SCREENING_PASS_SCORE
+    groups = (df['gender'].fillna('Unknown') if by == "gender" else df['job_id'].fillna(0).astype(int)).rename(by)
+    metric_frame = MetricFrame(
+        metrics={"count": count, "selection_rate": selection_rate,
+                 "true_positive_rate": true_positive_rate, "false_positive_rate": false_positive_rate},
+        y_true=y_true, y_pred=y_pred, sensitive_features=groups
+    )
+    return {
+        "by_group": metric_frame.by_group,
+        "demographic_parity_difference": float(demographic_parity_difference(y_true, y_pred, sensitive_features=groups)),
+        "equalized_odds_difference": float(equalized_odds_difference(y_true, y_pred, sensitive_features=groups)),
+    }
+
+def compare_fairness_metrics(by="gender", job_id=None, tolerance=1e-9):
+    """Returns a description of each figure where fairness_metrics and fairness_metrics_full disagree."""
+    counted, full = fairness_metrics(by, job_id), fairness_metrics_full(by, job_id)
+    mismatches = []
+    if list(counted["by_group"].index) != list(full["by_group"].index):
+        return [f"groups differ: {list(counted['by_group'].index)} from the counters, {list(full['by_group'].index)} recomputed"]
+    for metric in counted["by_group"].columns:
+        for group, value in counted["by_group"][metric].items():
+            if abs(value - full["by_group"].loc[group, metric]) > tolerance:
+                mismatches.append(f"{metric} of {group}: {value} from the counters, {full['by_group'].loc[group, metric]} recomputed")
+    for metric in ("demographic_parity_difference", "equalized_odds_difference"):
+        if abs(counted[metric] - full[metric]) > tolerance:
+            mismatches.append(f"{metric}: {counted[metric]} from the counters, {full[metric]} recomputed")
+    return mismatches
 
 def detect_bias():
-    # Load application data
-    df = pd.read_sql("SELECT gender, match_score, status FROM applications", conn)
-    
-    if df.empty:
+    job_data = load_job_titles()
+    job_titles = dict(zip(job_data["job_id"], job_data["title"]))
+    job_id = st.selectbox("Job", [None] + list(job_titles), format_func=lambda x: "All jobs" if x is None else job_titles[x],
+                          key="bias_job")
+    # Selection rates come from counters kept up to date as results are written
+    metrics = fairness_metrics("gender", job_id)
+    if metrics["by_group"].empty:
         st.warning("No applications available for bias analysis.")
         return
-    # Calculate the selection rate by gender
-    metric_frame = MetricFrame(
-        metrics=selection_rate,
-        y_true=df['status'] == 'Success',
-        y_pred=df['match_score'] >= 50,  # Assuming 'Success' if match_score is >= 50
-        sensitive_features=df['gender']
-    )
-    # Calculate demographic parity difference
-    parity_difference = demographic_parity_difference(
-        y_true=df['status'] == 'Success',
-        y_pred=df['match_score'] >= 50,
-        sensitive_features=df['gender']
-    )
-    st.write("Selection Rate by Gender:", metric_frame.by_group)
-    st.write("Demographic Parity Difference:", parity_difference )
+    parity_difference = metrics["demographic_parity_difference"]
+    st.write("Selection Rate by Gender:", metrics["by_group"])
+    st.write("Demographic Parity Difference:", parity_difference)
+    st.write("Equalized Odds Difference:", metrics["equalized_odds_difference"])
+    if job_id is None:
+        with st.expander("Selection Rate by Job"):
+            by_job = fairness_metrics("job_id")["by_group"]
+            by_job.index = [job_titles.get(job, f"Job {job}") for job in by_job.index]
+            st.dataframe(by_job)
 
     if abs(parity_difference) > 0.1:
         st.warning("Potential bias detected! Significant difference in selection rates. A value closer to 0 means fairness, while a higher value suggests potential bias.")
@@ -834,43 +2936,37 @@ def detect_bias():
 def approve_application(applicant_id, username, match_score):
     # Update status to "Approved" and send a message to the applicant
     message = f"Hi {username}, your resume passed 1st stage. It’s now in the 2nd stage. We'll notify you if you qualify."
-    cursor.execute("UPDATE applications SET status='Approved', feedback=? WHERE applicant_id=?", (message, applicant_id))
-    conn.commit()
+    # The categorize trigger files the approved application under its score's category
+    with ResultWriter() as writer:
+        writer.add(applicant_id, status="Approved", feedback=message)
     st.success("Applicant approved and notified.")
-    # Categorize based on match score
-    if match_score >= 80:
-        category = "Highly Fit"
-    elif match_score >= 70:
-        category = "Moderate Fit"
-    elif match_score >= 50:
-        category = "Low Fit"
-    else:
-        category = "Rejected"
-    # Save the category for display on the categorized page
-    cursor.execute("UPDATE applications SET category=? WHERE applicant_id=?", (category, applicant_id))
-    conn.commit()
 
 # Categorize applications based on match score
 def categorize_applications():
-    applications = cursor.execute("SELECT applicant_id, match_score FROM applications WHERE status='Success'").fetchall()
-    for app_id, match_score in applications:
-        if match_score >= 80:
-            category = "Highly Fit"
-        elif match_score >= 70:
-            category = "Moderate Fit"
-        elif match_score >= 50:
-            category = "Low Fit"
-        else:
-            category = "Rejected"
-        
-        cursor.execute("UPDATE applications SET category=? WHERE applicant_id=?", (category, app_id))
-    conn.commit()
-
-def send_invitation_email(name, email, pdf_path):
-    """Sends an invitation email to a rejected applicant for reassessment."""
-    sender_email = os.getenv("nguaemmanuel190@gmail.com")
-    sender_password = os.getenv("vyok ebpu lctf xupr")
+    """Recategorizes every successful or approved application in one set-based UPDATE.
 
+    Triggers already keep categories current as scores and statuses change;
+    this is for when the thresholds themselves change.
+    """
+    conn = get_connection()
+    with conn:
+        conn.execute(CATEGORIZE_SQL)
+
+def load_category_thresholds():
+    """Returns {category: minimum match score}, highest threshold first."""
+    rows = get_connection().execute("SELECT category, min_score FROM category_thresholds ORDER BY min_score DESC").fetchall()
+    return dict(rows)
+
+def save_category_thresholds(thresholds):
+    """Saves new minimum scores for the categories and recategorizes applications to match."""
+    conn = get_connection()
+    with conn:
+        conn.executemany("UPDATE category_thresholds SET min_score = ? WHERE category = ?",
+                         [(float(min_score), category) for category, min_score in thresholds.items()])
+        conn.execute(CATEGORIZE_SQL)
+
+def send_invitation_email(name, email, pdf_path, match_score, applicant_id=None):
+    """Queues an invitation email to a rejected applicant for reassessment and returns its message_id."""
     subject = "Reassessment Invitation for Your Job Application"
     body = f"""
     Dear {name},
@@ -885,36 +2981,53 @@ def send_invitation_email(name, email, pdf_path):
     HR Team
     """
 
-    msg = MIMEMultipart()
-    msg["From"] = sender_email
-    msg["To"] = email
-    msg["Subject"] = subject
-    msg.attach(MIMEText(body, "plain"))
-
     # Attach the PDF Report
-    with open(pdf_path, "rb") as attachment:
-        part = MIMEApplication(attachment.read(), Name=os.path.basename(pdf_path))
-        part["Content-Disposition"] = f'attachment; filename="{os.path.basename(pdf_path)}"'
-        msg.attach(part)
+    return enqueue_email(email, subject, body, attachment_path=pdf_path, attachment_name=f"{name}_Feedback.pdf",
+                         applicant_id=applicant_id, template="reassessment_invitation")
 
-    try:
-        with smtplib.SMTP("smtp.gmail.com", 587) as server:
-            server.starttls()
-            server.login(sender_email, sender_password)
-            server.sendmail(sender_email, email, msg.as_string())
-        st.success(f"✅ Invitation sent to {name} ({email})")
-    except Exception as e:
-        st.error(f"❌ Failed to send invitation to {name}: {e}")
+# Display the best-matching candidates for a job across all applications
+def view_recommended_candidates():
+    st.title("Recommended Candidates")
 
-# Dummy email_sent function to avoid errors
-def email_sent(email):
-    # Placeholder logic: Assume emails are not delivered initially
-    return False
+    job_data = load_job_titles()
+    if job_data.empty:
+        st.info("No job postings available.")
+        return
+
+    unindexed = count_unindexed_applications()
+    if unindexed:
+        st.info(f"{unindexed} applications are not indexed yet.")
+        if st.button("Index Applications"):
+            index_unindexed_applications()
+            st.rerun()
+
+    job_id = st.selectbox("Select Job", job_data["job_id"], format_func=lambda x: job_data[job_data["job_id"] == x]["title"].values[0])
+    top_k = st.slider("Number of Candidates", 1, 50, 10)
+
+    candidates = recommend_candidates(job_id, top_k)
+    if candidates.empty:
+        st.info("No candidates match this job's skills yet.")
+    else:
+        st.dataframe(candidates, hide_index=True)
+
+# Labels for the latest email_deliveries status of an applicant
+EMAIL_STATUS_LABELS = {"sent": "Delivered", "deferred": "Retrying", "failed": "Failed"}
 
 
 # Display categorized applications
 def view_categorized_applications():
+    cursor = get_connection().cursor()
     st.title("Categorized Applications")
+
+    with st.expander("Category thresholds"):
+        thresholds = load_category_thresholds()
+        new_thresholds = {
+            category: st.number_input(f"Minimum match score for {category}", 0.0, 100.0, float(min_score), key=f"threshold_{category}")
+            for category, min_score in thresholds.items()
+        }
+        if st.button("Save thresholds") and new_thresholds != thresholds:
+            save_category_thresholds(new_thresholds)
+            st.success("Thresholds saved; applications were recategorized.")
     
     # Categories and colors
     categories = [
@@ -942,23 +3055,18 @@ def view_categorized_applications():
     if clicked_category:
         st.subheader(f"Candidates for {clicked_category}")
         
-        # Fetch applicants
-        applicants = cursor.execute(
-            "SELECT name, email, match_score FROM applications WHERE category=?", 
-            (clicked_category,)
-        ).fetchall()
+        # Fetch applicants with the status of their latest email in the same indexed query
+        applicants = cursor.execute(CATEGORY_APPLICANTS_SQL, (clicked_category,)).fetchall()
         
         st.session_state["applicants"] = applicants
 
         if applicants:
             # Convert to Pandas DataFrame for better alignment
             import pandas as pd
-            applicant_df = pd.DataFrame(applicants, columns=["Name", "Email", "Match Score"])
+            applicant_df = pd.DataFrame(applicants, columns=["ID", "Name", "Email", "Match Score", "Email Status"])
+            applicant_df["Email Status"] = applicant_df["Email Status"].map(EMAIL_STATUS_LABELS).fillna("Not Delivered")
             
-            # Add Email Status Column
-            applicant_df["Email Status"] = applicant_df["Email"].apply(lambda email: "Delivered" if email_sent(email) else "Not Delivered")
-            
-            st.dataframe(applicant_df, hide_index=True)
+            st.dataframe(applicant_df.drop(columns="ID"), hide_index=True)
 
             # Send Emails Button
             if st.button(f"Send Emails to All {clicked_category} Candidates"):
@@ -968,9 +3076,6 @@ def view_categorized_applications():
 
 
 def send_ca_feedback(applicants, status):
-    sender_email = "nguaemmanuel190@gmail.com"
-    sender_password = "vyok ebpu lctf xupr"
-
     # Ensure applicants exist before sending emails
     if isinstance(applicants, pd.DataFrame):  # If applicants is a DataFrame
         if applicants.empty:
@@ -987,59 +3092,49 @@ def send_ca_feedback(applicants, status):
         st.error("Invalid applicants data format.")
         return
 
-    # Iterate through the list of applicants and send emails
+    # Queue an email per applicant, then deliver them in the background
+    message_ids = []
     for app in applicants_list:
         try:
             if isinstance(app, tuple) and len(app) >= 4:  # Ensure correct tuple length
                 app_id, name, email, score = app[:4]  # Extract required fields
                 subject = f"Application {status} Notification"
                 body = f"Dear {name},\n\nYour application has been categorized as '{status}' with a match score of {score}%."
-                message = f"Subject: {subject}\n\n{body}"
 
-                send_email(email, name, message)  # Send email
+                message_ids.append(send_email(email, name, subject, body, applicant_id=app_id, template=CATEGORY_EMAIL_TEMPLATE))
         except Exception as e:
             st.error(f"Error processing applicant {name}: {e}")
+    start_mail_dispatch(message_ids)
 
 # Function to validate email
 def is_valid_email(email):
     pattern = r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$"
     return re.match(pattern, email)
 
-# Function to send emails
-def send_email(email, name, message):
-    sender_email = "nguaemmanuel190@gmail.com"
-    sender_password = "vyok ebpu lctf xupr"
-
-    try:
-        if not is_valid_email(email):
-            st.error(f"Invalid email format: {email}")
-            return
+# Function to queue emails; returns the outbox message_id
+def send_email(email, name, subject, body, applicant_id=None, template=None):
+    if not is_valid_email(email):
+        st.error(f"Invalid email format: {email}")
+        return None
+    return enqueue_email(email, subject, body, applicant_id=applicant_id, template=template)
 
-        with smtplib.SMTP("smtp.gmail.com", 587) as server:
-            server.starttls()
-            server.login(sender_email, sender_password)
-            server.sendmail(sender_email, email, message)
-
-        st.success(f"Email sent successfully to {name} ({email})")
-    except Exception as e:
-        st.error(f"Failed to send email to {name}: {e}")
-
-# Function to send bulk rejection emails
+# Function to queue bulk rejection emails; returns the queued message_ids
 def send_bulk_feedback(applicants, status):
     if applicants.empty:
         st.warning("No applicants found to send emails.")
-        return
+        return []
 
     st.write("📧 Sending emails to", len(applicants), "applicants...")
 
+    message_ids = []
     for _, row in applicants.iterrows():
         name, email, match_score = row["name"], row["email"], row["match_score"]
 
         subject = f"Application {status} Notification"
         body = f"Dear {name},\n\nYour application has been categorized as '{status}' with a match score of {match_score}%."
-        message = f"Subject: {subject}\n\n{body}"
 
-        send_email(email, name, message)
+        message_ids.append(send_email(email, name, subject, body, applicant_id=row.get("applicant_id"), template="status_update"))
+    return [message_id for message_id in message_ids if message_id]
 
 def status_badge(status):
     """Returns a slanted badge-like HTML element for application status."""
@@ -1056,25 +3151,27 @@ def validate_email(email):
     return re.match(pattern, email)
 
 def applicant_dashboard():
+    conn = get_connection()
+    cursor = conn.cursor()
     st.sidebar.title("Applicant Dashboard")
     st.sidebar.title(f"Welcome, {st.session_state['username']} !!!")
     action = st.sidebar.radio("Options", ["View Jobs", "Apply for a Job", "My Applications"])
 
     if action == "View Jobs":
-        jobs = pd.read_sql("SELECT title, description, posted_on, deadline FROM jobs", conn)
+        jobs = cached_query("jobs", JOBS_LIST_SQL, scopes=[JOBS_SCOPE])
         st.write(jobs)
 
     elif action == "Apply for a Job":
         st.warning("!NOTE: You cannot edit your application after submission once you apply you cannot apply again.")
         # Load job data
-        job_data = pd.read_sql("SELECT job_id, title FROM jobs", conn)
+        job_data = load_job_titles()
         job_id = st.selectbox("Select Job", job_data["job_id"], format_func=lambda x: job_data[job_data["job_id"] == x]["title"].values[0])
 
         # Check if the user has already applied
-        existing_application = cursor.execute(
-            "SELECT COUNT(*) FROM applications WHERE user_id = ? AND job_id = ?", 
-            (st.session_state["user_id"], job_id)
-        ).fetchone()[0]
+        existing_application = cached_query(
+            "user job application count", USER_JOB_APPLICATION_COUNT_SQL,
+            (st.session_state["user_id"], None if job_id is None else int(job_id)), scopes=[user_applications_scope(st.session_state["user_id"])]
+        ).iloc[0, 0]
 
         if existing_application > 0:
             st.warning("⚠️ You have already applied for this job. You cannot apply again.")
@@ -1085,7 +3182,7 @@ def applicant_dashboard():
         email = st.text_input("Email Address", key="email").strip()
         gender = st.selectbox("Gender", ["--Choose your gender--", "Male", "Female", "Other", "Prefer not to say"], key="gender")
 
-        resume_upload = st.file_uploader("Upload Resume (PDF or Text)", type=["pdf", "txt"], key="resume_upload")
+        resume_upload = st.file_uploader("Upload Resume (PDF, DOCX or Text)", type=["pdf", "docx", "txt"], key="resume_upload")
         resume_text = st.text_area("Or Paste your Resume here", key="resume_text").strip()  # Alternative if no file uploaded
 
         # Process Form Submission
@@ -1120,50 +3217,51 @@ def applicant_dashboard():
                 st.stop()
 
             # Extract text from uploaded resume if provided
+            upload_hash = None
             if resume_upload:
                 try:
-                    resume_text = resume_upload.getvalue().decode("utf-8", errors="ignore")  # Safe decoding
+                    upload_hash, resume_text = ingest_resume(resume_upload.getvalue())
                 except Exception as e:
                     st.error(f"❌ Error processing uploaded file: {e}")
                     st.stop()
+                if not resume_text:
+                    st.error("❌ No text could be read from the uploaded file. If it is a scanned document, please paste your resume instead.")
+                    st.stop()
+            else:
+                resume_text = normalize_resume_text(resume_text)
 
             # Save application to the database
             submitted_on = datetime.now().strftime("%Y-%m-%d")
             full_name = f"{first_name}"
 
             cursor.execute(
-                "INSERT INTO applications (user_id, job_id, name, email, gender, submitted_on, resume) VALUES (?, ?, ?, ?, ?, ?, ?)", 
-                (st.session_state["user_id"], job_id, full_name, email, gender, submitted_on, resume_text)
+                "INSERT INTO applications (user_id, job_id, name, email, gender, submitted_on) VALUES (?, ?, ?, ?, ?, ?)", 
+                (st.session_state["user_id"], job_id, full_name, email, gender, submitted_on)
             )
+            applicant_id = cursor.lastrowid
+            cursor.execute("INSERT INTO application_resumes (applicant_id, resume_hash, upload_hash) VALUES (?, ?, ?)",
+                           (applicant_id, save_resume(resume_text), upload_hash))
             conn.commit()
+            # Extract the resume's skills once so screening never has to parse it again
+            store_application_skills(applicant_id, resume_text)
             st.success("✅ Application submitted successfully! You cannot edit your application after submission.")
 
             # Sending acknowledgment email
-            sender_email = "nguaemmanuel190@gmail.com"
-            sender_password = "vyok ebpu lctf xupr"
             subject = "Application Received"
             body = f"Dear {first_name},\n\nThank you for applying. Your application has been received, and you will be notified of every stage it undergoes."
-            message = f"Subject: {subject}\n\n{body}"
+            message_id = enqueue_email(email, subject, body, applicant_id=applicant_id, template="application_received")
 
-            try:
-                with smtplib.SMTP("smtp.gmail.com", 587) as server:
-                    server.starttls()
-                    server.login(sender_email, sender_password)
-                    server.sendmail(sender_email, email, message)
+            if deliver_outbox([message_id]).get(message_id) == "sent":
                 st.success("📩 A confirmation email has been sent to you.")
                 time.sleep(2)
-            except Exception as e:
-                st.error(f"❌ Failed to send email. Error: {e}")
+            else:
+                st.warning("📩 Your confirmation email could not be sent yet; we will retry shortly.")
 
             st.rerun()
 
     elif action == "My Applications":
-        applications = pd.read_sql("""
-            SELECT a.job_id, j.title, j.deadline, a.submitted_on, a.status, a.feedback, a.email
-            FROM applications a
-            JOIN jobs j ON a.job_id = j.job_id
-            WHERE a.user_id = ?
-        """, conn, params=(st.session_state["user_id"],))
+        applications = cached_query("user applications", USER_APPLICATIONS_SQL, (st.session_state["user_id"],),
+                                    scopes=[JOBS_SCOPE, user_applications_scope(st.session_state["user_id"])])
 
         if applications.empty:
             st.info("You have not applied for any jobs yet.")
@@ -1188,7 +3286,7 @@ def applicant_dashboard():
                         st.error(f"❌ Your application was not successful.\n\n Feedback: {row['feedback']}")
                     elif row["status"] == "Success":
                         st.success(f"🎉 {row['feedback']} We will reach out to you via **{row['email']}**.")
-                    elif row["status"] == "Under Review":
+                    elif row["status"] in ("Under Review", MANUAL_REVIEW_STATUS):
                         st.warning(f"⏳ Your application is under review. You will be notified at **{row['email']}**.")
 
 # Main function to handle app flow with logout option
@@ -1213,5 +3311,93 @@ def main():
             st.session_state.clear()  # Reset session state
             st.toast("🎉 **Goodbye!**")
             st.rerun()   # Refresh the app to reset to the login screen
+def run_cli(argv):
+    """Command line entry point, e.g. `python -m ats worker`."""
+    cursor = get_connection().cursor()
+    parser = argparse.ArgumentParser(prog="python -m ats", description="ATS command line tools.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    worker_parser = subparsers.add_parser("worker", help="Screen applications that are Under Review in the background.")
+    worker_parser.add_argument("--batch-size", type=int, default=SCREENING_BATCH_SIZE, help="Applications claimed per batch.")
+    worker_parser.add_argument("--poll-interval", type=float, default=SCREENING_POLL_INTERVAL, help="Seconds to wait when the queue is empty.")
+    worker_parser.add_argument("--once", action="store_true", help="Exit once no applications are left to screen.")
+
+    subparsers.add_parser("explain", help="Print the query plan of each dashboard query; fails if one scans applications.")
+
+    migrate_parser = subparsers.add_parser("migrate", help="Apply pending schema migrations, then optionally backfill derived data.")
+    migrate_parser.add_argument("--backfill", nargs="+", choices=("skills", "scores", "counters"), default=[],
+                                help="Backfill extracted skills, recompute match scores of screened applications "
+                                     "and/or recount the dashboard and fairness counters.")
+    migrate_parser.add_argument("--batch-size", type=int, default=SCREENING_BATCH_SIZE, help="Applications processed per batch.")
+
+    fairness_parser = subparsers.add_parser("fairness", help="Print selection rates and fairness differences from the counters.")
+    fairness_parser.add_argument("--by", choices=FAIRNESS_GROUPS, default="gender", help="Group applications by gender or job.")
+    fairness_parser.add_argument("--job-id", type=int, help="Only count applications to this job.")
+    fairness_parser.add_argument("--verify", action="store_true",
+                                 help="Recompute the metrics from every application with fairlearn; fails if the counters disagree.")
+
+    export_parser = subparsers.add_parser("export", help="Stream the applicant report to a file, e.g. for nightly dumps.")
+    export_parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="csv.gz", help="Output format.")
+    export_parser.add_argument("--output", help="Output path, or - for stdout (default: a timestamped file in exports/).")
+    export_parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE, help="Rows read and written at a time.")
+
+    args = parser.parse_args(argv)
+    # `export --output -` owns stdout, so messages such as applied migrations go to stderr
+    data_stdout = sys.stdout
+    messages_to_stderr = args.command == "export" and args.output == "-"
+    with contextlib.redirect_stdout(sys.stderr) if messages_to_stderr else contextlib.nullcontext():
+        setup_database()
+    if args.command == "worker":
+        run_screening_worker(batch_size=args.batch_size, poll_interval=args.poll_interval, once=args.once)
+    elif args.command == "explain":
+        full_scans = 0
+        for name, (details, scans) in explain_dashboard_queries().items():
+            print(f"{name}:")
+            for detail in details:
+                print(f"    {detail}")
+            full_scans += len(scans)
+        if full_scans:
+            sys.exit(f"{full_scans} dashboard query step(s) scan applications without an index.")
+    elif args.command == "migrate":
+        for version, description, applied_on in cursor.execute("SELECT version, description, applied_on FROM schema_version ORDER BY version"):
+            print(f"Schema version {version} ({applied_on}): {description}")
+        if "skills" in args.backfill:
+            backfill_skills(batch_size=args.batch_size)
+        if "scores" in args.backfill:
+            backfill_match_scores(batch_size=args.batch_size)
+        if "counters" in args.backfill:
+            rebuild_dashboard_counters()
+            rebuild_fairness_counters()
+            get_connection().commit()
+            print("Recounted dashboard and fairness counters.")
+    elif args.command == "fairness":
+        metrics = fairness_metrics(args.by, args.job_id)
+        print(metrics["by_group"].to_string())
+        print(f"Demographic parity difference: {metrics['demographic_parity_difference']:.4f}")
+        print(f"Equalized odds difference: {metrics['equalized_odds_difference']:.4f}")
+        if args.verify:
+            mismatches = compare_fairness_metrics(args.by, args.job_id)
+            for mismatch in mismatches:
+                print(f"    {mismatch}")
+            if mismatches:
+                sys.exit(f"{len(mismatches)} fairness figure(s) differ from a full recomputation; "
+                         "run `python -m ats migrate --backfill counters`.")
+            print("Counters match a full recomputation.")
+    elif args.command == "export":
+        if args.output == "-":
+            with contextlib.redirect_stdout(sys.stderr):
+                rows = export_report(data_stdout.buffer, args.format, chunk_size=args.chunk_size)
+            data_stdout.buffer.flush()
+            print(f"Exported {rows} rows.", file=sys.stderr)
+        else:
+            path, rows = export_report_file(args.format, args.output, chunk_size=args.chunk_size)
+            print(f"Exported {rows} rows to {path}.")
+
+CLI_COMMANDS = {"worker", "explain", "migrate", "export", "fairness"}
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # `streamlit run ats.py` renders the app; `python -m ats <command>` runs a CLI command
+    if len(sys.argv) > 1 and sys.argv[1] in CLI_COMMANDS:
+        run_cli(sys.argv[1:])
+    else:
+        main()
\ No newline at end of file
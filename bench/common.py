@@ -0,0 +1,35 @@
+"""Shared setup for the benchmarks: runs ats against a throwaway database.
+
+Every benchmark imports ats through load_ats(), which points ATS_DB_PATH at a
+temporary directory (and changes into it, so reports and exports land there
+too). The repository's ats_system.db is never written.
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def temp_workdir():
+    """Creates and changes into a temporary working directory."""
+    workdir = tempfile.mkdtemp(prefix="ats-bench-")
+    os.chdir(workdir)
+    return workdir
+
+def load_ats(copy_of=None):
+    """Imports ats with ATS_DB_PATH set to a new temporary database, optionally a copy of another one."""
+    copy_of = copy_of and os.path.abspath(copy_of)
+    path = os.path.join(temp_workdir(), "ats_system.db")
+    if copy_of:
+        shutil.copy(copy_of, path)
+    os.environ["ATS_DB_PATH"] = path
+    sys.path.insert(0, REPO_DIR)
+    import ats
+    ats.setup_database()
+    return ats
+
+def percentile(values, q):
+    """Returns the q-th quantile (0-1) of a list of numbers."""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float("nan")
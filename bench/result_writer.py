@@ -0,0 +1,75 @@
+"""Writing screening results one commit per row versus batched through ResultWriter.
+
+Both arms run ResultWriter.UPDATE_SQL against a copy of the same migrated
+database, so the categorize, counter and cache-version triggers fire as in
+production, and through the same get_connection() with the same journal mode
+and synchronous setting.
+
+    python bench/result_writer.py --rows 100000
+"""
+import argparse
+import os
+import shutil
+import time
+
+from common import load_ats
+
+SETTINGS = (("rollback journal, synchronous=FULL", "DELETE", "FULL"), ("WAL, synchronous=NORMAL", "WAL", "NORMAL"))
+
+def seed(ats, rows):
+    """Adds `rows` applications Under Review to the migrated database, closes it and returns their ids."""
+    db = ats.get_connection()
+    db.executemany("INSERT INTO applications (user_id, job_id, name, email, gender, submitted_on) VALUES (?, ?, ?, ?, ?, ?)",
+                   [(i % 500, i % 20, f"n{i}", f"e{i}@example.com", "Male", "2024-01-01") for i in range(rows)])
+    db.commit()
+    applicant_ids = [applicant_id for (applicant_id,) in db.execute("SELECT applicant_id FROM applications")]
+    db.close()
+    del ats.connection_provider(ats.DB_PATH).local.db
+    return applicant_ids
+
+def connect(ats, template, path, journal_mode, synchronous):
+    """Points ats at a fresh copy of the seeded database and returns its connection, with the given settings."""
+    shutil.copy(template, path)
+    ats.DB_PATH = path
+    db = ats.get_connection()
+    mode = db.execute(f"PRAGMA journal_mode={journal_mode}").fetchone()[0]
+    if mode.upper() != journal_mode:
+        raise RuntimeError(f"Could not switch {path} to journal_mode={journal_mode} (still {mode}).")
+    db.execute(f"PRAGMA synchronous={synchronous}")
+    return db
+
+def close(ats):
+    ats.get_connection().close()
+    del ats.connection_provider(ats.DB_PATH).local.db
+    os.remove(ats.DB_PATH)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000, help="Results written per run.")
+    args = parser.parse_args()
+    ats = load_ats()
+    template = ats.DB_PATH
+    applicant_ids = seed(ats, args.rows)
+    results = [(applicant_id, "Rejected" if applicant_id % 2 else "Success", f"feedback {applicant_id}", float(applicant_id % 100),
+                f"reports/{applicant_id}.pdf") for applicant_id in applicant_ids]
+    for label, journal_mode, synchronous in SETTINGS:
+        db = connect(ats, template, "per_row.db", journal_mode, synchronous)
+        start = time.perf_counter()
+        for applicant_id, status, feedback, match_score, pdf_report in results:
+            db.execute(ats.ResultWriter.UPDATE_SQL, (status, feedback, match_score, None, pdf_report, applicant_id))
+            db.commit()
+        per_row = time.perf_counter() - start
+        close(ats)
+
+        connect(ats, template, "batched.db", journal_mode, synchronous)
+        start = time.perf_counter()
+        with ats.ResultWriter() as writer:
+            for applicant_id, status, feedback, match_score, pdf_report in results:
+                writer.add(applicant_id, status=status, feedback=feedback, match_score=match_score, pdf_report=pdf_report)
+        batched = time.perf_counter() - start
+        close(ats)
+        print(f"{label}: per-row commit {per_row:.2f}s ({len(results) / per_row:,.0f} rows/s); "
+              f"ResultWriter {batched:.2f}s ({len(results) / batched:,.0f} rows/s), {writer.written} rows written")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Throughput and noise sensitivity of each skill extractor in SKILL_EXTRACTORS.
+
+Synthetic resumes and job descriptions mix known skills with generic filler.
+For each extractor this reports documents per second, skills found per job,
+and how much a paragraph of filler moves the match score and flips decisions.
+The documents are synthetic; check real job descriptions before changing
+ATS_SKILL_EXTRACTOR (see --jobs-from-db).
+
+    python bench/skill_extractors.py --docs 3000 --jobs-from-db ats_system.db
+"""
+import argparse
+import random
+import statistics
+import time
+
+from common import load_ats
+
+SKILLS = ["Python", "SQL", "machine learning", "Docker", "Kubernetes", "AWS", "React", "Node.js", "data analysis", "Tableau",
+          "project management", "Java", "C++", "Spark", "Airflow", "TensorFlow", "Scrum", "Power BI", "PostgreSQL", "CI/CD", "Git", "Linux"]
+FILLER = ["Results-driven professional with years of experience in fast-paced environments.",
+          "Strong team player who works with stakeholders across the organization.",
+          "Responsible for delivering solutions and improving processes for customers.",
+          "Passionate about learning new things and taking ownership of outcomes.",
+          "Led initiatives that increased efficiency and reduced costs for the business."]
+
+def document(n_skills, n_filler):
+    parts = [f"Worked with {random.choice(SKILLS)} and {random.choice(SKILLS)} on production systems." for _ in range(n_skills)]
+    parts += random.sample(FILLER * 4, n_filler)
+    random.shuffle(parts)
+    return " ".join(parts)
+
+def flipped(scores, other_scores, pass_score):
+    return sum((a >= pass_score) != (b >= pass_score) for a, b in zip(scores, other_scores)) / len(scores)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=3000, help="Synthetic resumes (and as many jobs).")
+    parser.add_argument("--seed", type=int, default=25)
+    parser.add_argument("--jobs-from-db", help="Also list the skills each extractor finds in the jobs of this database.")
+    args = parser.parse_args()
+    ats = load_ats(copy_of=args.jobs_from_db)
+    random.seed(args.seed)
+    resumes = [document(random.randint(3, 8), random.randint(2, 6)) for _ in range(args.docs)]
+    jobs = [document(random.randint(3, 6), random.randint(1, 3)) for _ in range(args.docs)]
+    padding = " ".join(FILLER)
+    words = sum(len(text.split()) for text in resumes + jobs)
+    for name, extract in ats.SKILL_EXTRACTORS.items():
+        extract(["warm up"])
+        start = time.perf_counter()
+        resume_skills = extract(resumes)
+        job_skills = extract(jobs)
+        elapsed = time.perf_counter() - start
+        scores, _ = ats.aligned_scores(resume_skills, job_skills)
+        # The same resumes and jobs with one more paragraph of generic filler
+        padded_resume_scores, _ = ats.aligned_scores(extract([text + " " + padding for text in resumes]), job_skills)
+        padded_job_scores, _ = ats.aligned_scores(resume_skills, extract([text + " " + padding for text in jobs]))
+        print(f"{name:8s} {len(resumes + jobs) / elapsed:8.0f} docs/s ({words / elapsed / 1e3:.0f}k words/s)"
+              f" | skills/job {statistics.mean(map(len, job_skills)):.1f}"
+              f" | filler in resume: mean |dscore| {statistics.mean(abs(a - b) for a, b in zip(scores, padded_resume_scores)):.2f},"
+              f" flipped {flipped(scores, padded_resume_scores, ats.SCREENING_PASS_SCORE):.1%}"
+              f" | filler in job: mean |dscore| {statistics.mean(abs(a - b) for a, b in zip(scores, padded_job_scores)):.2f},"
+              f" flipped {flipped(scores, padded_job_scores, ats.SCREENING_PASS_SCORE):.1%}")
+        if args.jobs_from_db:
+            db_jobs = ats.get_connection().execute("SELECT title, description FROM jobs ORDER BY job_id").fetchall()
+            for (title, _), skills in zip(db_jobs, extract([description for _, description in db_jobs])):
+                print(f"         {title}: {sorted(skills) or 'NO SKILLS'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Cold import time of ats, and which heavy libraries it loads before they are needed.
+
+Each run imports ats in a fresh interpreter against a temporary database.
+Pass --rev to compare with ats.py as of an earlier git revision.
+
+    python bench/startup.py --runs 7 --rev HEAD~5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+from common import REPO_DIR, temp_workdir
+
+HEAVY_MODULES = ("spacy", "fairlearn", "matplotlib", "seaborn", "scipy.sparse", "reportlab")
+IMPORT_CODE = f"""
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+import ats
+print(time.perf_counter() - start, ",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules) or "-")
+"""
+
+def measure(source_dir, runs):
+    workdir = temp_workdir()
+    env = {**os.environ, "ATS_DB_PATH": os.path.join(workdir, "ats_system.db")}
+    results = [subprocess.run([sys.executable, "-c", IMPORT_CODE, source_dir], capture_output=True, text=True,
+                              cwd=workdir, env=env, check=True).stdout.split()[-2:] for _ in range(runs)]
+    return statistics.median(float(seconds) for seconds, _ in results), results[0][1]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7, help="Imports per version; the median is reported.")
+    parser.add_argument("--rev", help="Also measure ats.py at this git revision.")
+    args = parser.parse_args()
+    versions = [("working tree", REPO_DIR)]
+    if args.rev:
+        source = subprocess.run(["git", "show", f"{args.rev}:ats.py"], cwd=REPO_DIR, capture_output=True, text=True, check=True).stdout
+        source_dir = temp_workdir()
+        with open(os.path.join(source_dir, "ats.py"), "w", encoding="utf-8") as f:
+            f.write(source)
+        versions.insert(0, (args.rev, source_dir))
+    for label, source_dir in versions:
+        seconds, loaded = measure(source_dir, args.runs)
+        print(f"{label:14s} median import {seconds:.2f}s, heavy modules loaded: {loaded}")
+
+if __name__ == "__main__":
+    main()
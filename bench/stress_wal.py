@@ -0,0 +1,84 @@
+"""Dashboard read latency while the screening worker writes, with and without WAL.
+
+One writer commits screening-style batches of row updates while several
+readers run the dashboard's count and page queries. Reports read latency
+percentiles and lock errors for the rollback journal and for WAL mode.
+
+    python bench/stress_wal.py --rows 60000 --seconds 4
+"""
+import argparse
+import sqlite3
+import threading
+import time
+
+from common import load_ats, percentile
+
+def seed(ats, rows):
+    db = ats.get_connection()
+    db.executemany(
+        "INSERT INTO applications (user_id, job_id, name, email, gender, submitted_on, status, match_score) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [(i % 500, i % 20, f"n{i}", f"e{i}@example.com", "Male", "2024-01-01",
+          ("Under Review", "Success", "Rejected")[i % 3], i % 100) for i in range(rows)],
+    )
+    db.commit()
+    # Switching journal modes needs every other connection closed
+    db.close()
+    del ats.connection_provider(ats.DB_PATH).local.db
+
+def run(ats, mode, seconds, readers, batch):
+    def connect():
+        if mode == "wal":
+            return ats.open_connection(ats.DB_PATH)
+        return sqlite3.connect(ats.DB_PATH, timeout=5)
+    setup = connect()
+    setup.execute("PRAGMA journal_mode=" + ("WAL" if mode == "wal" else "DELETE"))
+    setup.close()
+    stop = time.time() + seconds
+    latencies, errors, writes = [], [], [0]
+
+    def writer():
+        db = connect()
+        ids = [applicant_id for (applicant_id,) in db.execute("SELECT applicant_id FROM applications WHERE status = 'Under Review'")]
+        offset = 0
+        while time.time() < stop:
+            db.executemany("UPDATE applications SET feedback = ?, match_score = ? WHERE applicant_id = ?",
+                           [("feedback " * 10, (j * 7) % 100, ids[(offset + j) % len(ids)]) for j in range(batch)])
+            time.sleep(0.05)  # scoring and report rendering while the transaction is open
+            db.commit()
+            writes[0] += 1
+            offset += batch
+
+    def reader():
+        db = connect()
+        while time.time() < stop:
+            start = time.perf_counter()
+            try:
+                db.execute(ats.DASHBOARD_COUNTS_SQL, ("status",)).fetchall()
+                db.execute(ats.APPLICATIONS_PAGE_SQL, ("Rejected", 0, ats.ADMIN_PAGE_SIZE)).fetchall()
+            except sqlite3.OperationalError as error:
+                errors.append(str(error))
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"{mode:6s} writes={writes[0]:4d} reads={len(latencies):7d} p50={percentile(latencies, .5):7.2f}ms "
+          f"p99={percentile(latencies, .99):7.2f}ms max={max(latencies, default=0):8.2f}ms errors={len(errors)}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=60000, help="Applications in the database.")
+    parser.add_argument("--seconds", type=float, default=4.0, help="Duration of each run.")
+    parser.add_argument("--readers", type=int, default=4, help="Concurrent reader threads.")
+    parser.add_argument("--batch", type=int, default=2000, help="Rows updated per write transaction.")
+    args = parser.parse_args()
+    ats = load_ats()
+    seed(ats, args.rows)
+    for mode in ("delete", "wal"):
+        run(ats, mode, args.seconds, args.readers, args.batch)
+
+if __name__ == "__main__":
+    main()